@@ -4,7 +4,6 @@
 
 import time
 import sys
-import threading
 from colorama import init, Fore, Style
 
 # Initialize colorama
@@ -13,8 +12,15 @@ init()
 from utils.config import load_config
 from utils.state import DemoState
 from utils.database import connect, ensure_schema, truncate, vacuum, server_fingerprint
-from utils.aws import get_rds_primary_az
-from utils.loops import run_write_loop, run_read_loop
+from utils.aws import get_rds_primary_az, start_rds_poller, start_failover_trigger, start_cloudwatch_publisher
+from utils.multiproc import engine_threads
+from utils.histogram import format_summary, export_json
+from utils.recorder import MetricsRecorder
+from utils.prometheus import start_metrics_server
+from utils.resolver import start_resolver
+from utils.verify import verify_rpo
+from utils.ledger import AckLedger
+from utils.events import EventSink
 
 def print_banner():
     """Print mission banner"""
@@ -34,6 +40,8 @@ def main():
     
     cfg = load_config()
     state = DemoState()
+    state.acked = AckLedger.from_config(cfg)
+    state.events = EventSink.from_config(cfg)
 
     # Initial connection for schema & fingerprint
     try:
@@ -41,6 +49,8 @@ def main():
             conn.autocommit = True
             ensure_schema(conn)
             truncate(conn)
+            # Schema variant after the truncate: a column type change rewrites an empty table
+            ensure_schema(conn, cfg)
             vacuum(conn)
             fp = server_fingerprint(conn)
             state.first_fp = fp
@@ -61,12 +71,40 @@ def main():
     while time.time() < warmup_deadline and not state.stop.is_set():
         time.sleep(1)
 
+    # With PROCESSES>1 every worker runs its own resolver
+    resolver = start_resolver(cfg, state) if cfg.processes <= 1 else None
+    if resolver:
+        print(f"{Fore.BLUE}[DNS]{Style.RESET_ALL} {cfg.db_host} -> {resolver.address()} (ttl {cfg.dns_ttl_s}s)")
+
+    # Control plane: instance status / AZ transitions and RDS events on the timeline
+    rds_poller = start_rds_poller(cfg, state)
+    if rds_poller:
+        print(f"{Fore.BLUE}[RDS]{Style.RESET_ALL} Polling {cfg.rds_instance_id} every {cfg.rds_poll_s:g}s")
+
     # Start monitoring loops
-    print(f"{Fore.GREEN}[MISSION]{Style.RESET_ALL} Starting traffic generation...")
-    t_write = threading.Thread(target=run_write_loop, args=(cfg, state), daemon=True)
-    t_read = threading.Thread(target=run_read_loop, args=(cfg, state), daemon=True)
-    t_write.start()
-    t_read.start()
+    print(f"{Fore.GREEN}[MISSION]{Style.RESET_ALL} Starting traffic generation... (engine={cfg.engine})")
+    for op, profile in (("write", cfg.write_profile), ("read", cfg.read_profile)):
+        if profile is not None:
+            print(f"{Fore.GREEN}[MISSION]{Style.RESET_ALL} {op} profile: {profile!r}")
+    workers = engine_threads(cfg, state)
+    state.events.start()
+    recorder = None
+    if cfg.metrics_csv and cfg.processes <= 1:
+        # With PROCESSES>1 each worker records its own series
+        recorder = MetricsRecorder(state, cfg.metrics_capacity, cfg.metrics_interval_s)
+        recorder.start()
+    metrics_server = start_metrics_server(cfg, state) if cfg.processes <= 1 else None
+    if metrics_server:
+        print(f"{Fore.BLUE}[METRICS]{Style.RESET_ALL} Prometheus endpoint on :{metrics_server.port}/metrics")
+    cloudwatch = start_cloudwatch_publisher(cfg, state) if cfg.processes <= 1 else None
+    if cloudwatch:
+        print(f"{Fore.BLUE}[CLOUDWATCH]{Style.RESET_ALL} Publishing to {cfg.cw_namespace} every {cfg.cw_interval_s:g}s ({cfg.cw_metrics})")
+    for t in workers:
+        t.start()
+    failover = start_failover_trigger(cfg, state)
+    if failover:
+        every = f", then every {cfg.failover_every_s:g}s" if cfg.failover_every_s > 0 else ""
+        print(f"{Fore.MAGENTA}[FAILOVER]{Style.RESET_ALL} Scheduled at t+{failover.at_s:g}s{every}")
 
     # Runtime
     deadline = time.time() + cfg.runtime_seconds
@@ -77,8 +115,28 @@ def main():
         print(f"\n{Fore.YELLOW}[STOP]{Style.RESET_ALL} Mission interrupted by user")
     finally:
         state.stop.set()
-        t_write.join(timeout=5)
-        t_read.join(timeout=5)
+        if failover:
+            failover.stop()
+        for t in workers:
+            t.join(timeout=5 if cfg.processes <= 1 else 30)
+        state.events.stop()
+        if metrics_server:
+            metrics_server.stop()
+        if cloudwatch:
+            cloudwatch.stop()
+        if resolver:
+            resolver.stop()
+        if rds_poller:
+            rds_poller.stop()
+            if rds_poller.throttled:
+                print(f"{Fore.BLUE}[RDS]{Style.RESET_ALL} {rds_poller.polls} polls, {rds_poller.throttled} throttled")
+        if recorder:
+            recorder.stop()
+            try:
+                recorder.write_csv(cfg.metrics_csv)
+                print(f"{Fore.BLUE}[METRICS]{Style.RESET_ALL} {recorder.n} samples written to {cfg.metrics_csv}")
+            except OSError as e:
+                print(f"{Fore.RED}[METRICS] Could not write {cfg.metrics_csv}: {e}{Style.RESET_ALL}")
 
     # Final checks
     try:
@@ -89,23 +147,26 @@ def main():
 
     state.last_az = get_rds_primary_az(cfg)
 
-    # RPO=0 verification
+    # RPO=0 verification: every acknowledged id against the table (server-side, chunked)
+    rpo = None
     rpo_zero = "UNKNOWN"
     gap_note = ""
     try:
-        with connect(cfg) as conn, conn.cursor() as cur:
-            cur.execute("SELECT max(id) AS max_id FROM demo_events;")
-            max_id = int(cur.fetchone()["max_id"] or 0)
-            if state.last_id_before_error:
-                cur.execute("SELECT id FROM demo_events ORDER BY id DESC LIMIT 10;")
-                ids = [int(r["id"]) for r in cur.fetchall()]
-                contiguous = all(ids[i] - ids[i+1] == 1 for i in range(len(ids) - 1))
-                rpo_zero = "YES" if contiguous else f"LIKELY YES (contiguous={contiguous})"
-                gap_note = f"(sample: {ids[:5]}...)"
-            else:
-                rpo_zero = "YES (no failure detected)"
+        with connect(cfg) as conn:
+            rpo = verify_rpo(conn, state.acked, cfg.rpo_chunk)
+        if rpo.rpo_zero:
+            rpo_zero = f"{Fore.GREEN}YES{Style.RESET_ALL}"
+            intact = " and intact" if rpo.altered is not None else ""
+            gap_note = f"({rpo.acked} acknowledged writes all present{intact}, checked in {rpo.elapsed_s:.2f}s)"
+        else:
+            rpo_zero = f"{Fore.RED}NO{Style.RESET_ALL}"
+            gap_note = f"({rpo.missing} of {rpo.acked} acknowledged writes missing, e.g. {rpo.missing_sample})"
+            if rpo.altered:
+                gap_note += f" ({rpo.altered} with another payload, e.g. {rpo.altered_sample})"
     except Exception as e:
         rpo_zero = f"UNKNOWN ({e})"
+    finally:
+        state.acked.close()
 
     # Mission Report
     print(f"\n{Fore.BLUE}==================== DB007 MISSION REPORT ===================={Style.RESET_ALL}")
@@ -119,6 +180,34 @@ def main():
     print(f"Total reads              : {state.read_count}")
     print(f"Estimated downtime (s)   : {state.total_downtime_s:.2f}")
     print(f"RPO = 0 confirmed        : {rpo_zero} {gap_note}")
+    if rpo and rpo.unexpected:
+        print(f"Unacknowledged rows      : {rpo.unexpected} (committed, ack lost to the outage) e.g. {rpo.unexpected_sample}")
+    for n, o in enumerate(state.timeline.outages, 1):
+        if o.rto_s is not None:
+            rto = f"{o.rto_s * 1000:.0f} ms"
+            if o.rto_uncertainty_s is not None:
+                rto += f" (last failed attempt {o.rto_uncertainty_s * 1000:.0f} ms before the first commit)"
+        else:
+            rto = "n/a (not recovered)" if o.first_ok_at is None else "n/a (no commit before)"
+        print(f"Outage #{n} RTO           : {rto} "
+              f"(detected after {(o.detection_s or 0) * 1000:.0f} ms, {o.failed_attempts} failed attempts)")
+        if o.last_ok_at is not None:
+            print(f"  last commit            : t+{state.timeline.rel(o.last_ok_at):.3f}s on {o.fp_before}")
+        if o.first_ok_at is not None:
+            print(f"  first commit           : t+{state.timeline.rel(o.first_ok_at):.3f}s on {o.fp_after}")
+        req = state.timeline.request_for(o)
+        if req is not None and o.first_ok_at is not None:
+            print(f"  failover requested     : t+{state.timeline.rel(req.at):.3f}s "
+                  f"(writes failed {(o.first_error_at - req.at) * 1000:.0f} ms later, "
+                  f"resumed {(o.first_ok_at - req.at) * 1000:.0f} ms after the request)")
+    for m in state.timeline.marks:
+        print(f"  event t+{state.timeline.rel(m.at):.3f}s     : {m.kind} {m.detail}")
+    if cfg.timeline_export:
+        try:
+            state.timeline.export_json(cfg.timeline_export)
+            print(f"Outage timeline          : {cfg.timeline_export}")
+        except OSError as e:
+            print(f"{Fore.RED}[END] Could not export timeline: {e}{Style.RESET_ALL}")
     
     if state.first_fp and state.last_fp and state.first_fp != state.last_fp:
         print(f"Writer changed           : {Fore.GREEN}YES 🛰️ (failover observed){Style.RESET_ALL}")
@@ -130,6 +219,25 @@ def main():
     else:
         print("AZ changed               : NO/UNKNOWN")
     
+    if state.stale_ids.total:
+        s = state.stale_ids.summary()
+        print(f"Stale reads              : {state.stale_reads} of {state.stale_ids.total} "
+              f"(ids behind p50={s['p50']:.0f} p99={s['p99']:.0f} max={s['max']:.0f}; ms in LATENCY/staleness)")
+    for op, st in state.slots.items():
+        print(f"Open-loop {op:<5} slots    : {st.issued} issued, {st.late} late (>{cfg.late_threshold_ms:g} ms), "
+              f"{st.missed} missed, max lag {st.max_lag_ms:.1f} ms")
+
+    print(f"{Fore.BLUE}------------------------ LATENCY (ms) -------------------------{Style.RESET_ALL}")
+    for op, h in state.latency.items():
+        if h.total:
+            print(format_summary(op, h))
+    if cfg.latency_export:
+        try:
+            export_json(cfg.latency_export, state.latency)
+            print(f"Latency histograms       : {cfg.latency_export}")
+        except OSError as e:
+            print(f"{Fore.RED}[END] Could not export latency: {e}{Style.RESET_ALL}")
+
     print(f"{Fore.BLUE}==============================================================={Style.RESET_ALL}")
     print(f"\n{Fore.GREEN}Mission accomplished. License to query remains valid. 🕶️{Style.RESET_ALL}")
 
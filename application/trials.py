@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# Mission DB007 - Repeated failover trials
+# N load + failover cycles against the same schema, summarized across trials
+
+import dataclasses
+import json
+import sys
+import time
+from colorama import init, Fore, Style
+
+# Initialize colorama
+init()
+
+from utils.config import load_config
+from utils.state import DemoState
+from utils.database import connect, ensure_schema, truncate, vacuum, server_fingerprint
+from utils.aws import (
+    boto3, rds_client, FailoverTrigger, start_cloudwatch_publisher, start_rds_poller, wait_until_available,
+)
+from utils.multiproc import engine_threads
+from utils.resolver import start_resolver
+from utils.prometheus import start_metrics_server
+from utils.verify import verify_rpo
+from utils.ledger import AckLedger
+from utils.events import EventSink
+from utils.stats import summarize
+
+# Default delay between the start of a trial's traffic and its failover
+DEFAULT_FAILOVER_AT_S = 30.0
+
+# Per-trial figures summarized across trials (key, label, unit)
+METRICS = (
+    ("rto_ms", "RTO (last -> first commit)", "ms"),
+    ("rto_uncertainty_ms", "RTO uncertainty", "ms"),
+    ("resume_ms", "Request -> first commit", "ms"),
+    ("detection_ms", "Detection", "ms"),
+    ("downtime_s", "Downtime", "s"),
+    ("write_p50_ms", "Write p50", "ms"),
+    ("write_p99_ms", "Write p99", "ms"),
+    ("write_errors", "Write errors", ""),
+)
+
+def _ms(s):
+    return None if s is None else s * 1000.0
+
+def run_trial(cfg, state: DemoState, client, at_s: float) -> dict:
+    """One load + failover cycle; returns its figures"""
+    resolver = start_resolver(cfg, state)
+    rds_poller = start_rds_poller(cfg, state)
+    metrics_server = start_metrics_server(cfg, state)
+    cloudwatch = start_cloudwatch_publisher(cfg, state)
+    workers = engine_threads(cfg, state)
+    for t in workers:
+        t.start()
+    trigger = FailoverTrigger(client, cfg.rds_instance_id, state.timeline, state.events, at_s)
+    trigger.start()
+
+    # Until the writes are back for TRIAL_SETTLE_S, the request is rejected, or the timeout
+    deadline = time.monotonic() + at_s + cfg.trial_timeout_s
+    try:
+        while time.monotonic() < deadline and not state.stop.is_set():
+            time.sleep(0.5)
+            if trigger.rejected:
+                break  # not while the reboot call is still in flight: only once RDS answered no
+            recovered = [o.first_ok_at for o in state.timeline.outages
+                         if o.first_ok_at is not None and state.timeline.request_for(o) is not None]
+            if recovered and time.monotonic() >= recovered[0] + cfg.trial_settle_s:
+                break
+    finally:
+        state.stop.set()
+        trigger.stop()
+        for t in workers:
+            t.join(timeout=5)
+        if resolver:
+            resolver.stop()
+        if rds_poller:
+            rds_poller.stop()
+        if metrics_server:
+            metrics_server.stop()
+        if cloudwatch:
+            cloudwatch.stop()
+
+    outage = next((o for o in state.timeline.outages if state.timeline.request_for(o) is not None), None)
+    req = state.timeline.request_for(outage) if outage else None
+    write = state.latency["write"]
+    return {
+        "failover_accepted": bool(trigger.accepted),
+        "recovered": outage is not None and outage.first_ok_at is not None,
+        "rto_ms": _ms(outage.rto_s) if outage else None,
+        "rto_uncertainty_ms": _ms(outage.rto_uncertainty_s) if outage else None,
+        "resume_ms": _ms(outage.first_ok_at - req.at) if outage and outage.first_ok_at is not None else None,
+        "detection_ms": _ms(outage.detection_s) if outage else None,
+        "downtime_s": state.total_downtime_s,
+        "write_p50_ms": write.percentile(50.0) if write.total else None,
+        "write_p99_ms": write.percentile(99.0) if write.total else None,
+        "writes": state.write_count,
+        "write_errors": state.write_errors,
+        "fp_before": outage.fp_before if outage else None,
+        "fp_after": outage.fp_after if outage else None,
+        "outages": len(state.timeline.outages),
+    }
+
+def _fmt(v, unit=""):
+    if v is None:
+        return "n/a"
+    if unit == "s":
+        return f"{v:.2f}"
+    return f"{v:.0f}"
+
+def main():
+    cfg = load_config()
+    if not (cfg.aws_region and cfg.rds_instance_id and boto3):
+        print("[CONFIG] trials.py triggers the failovers itself: AWS_REGION, RDS_INSTANCE_ID and boto3 are needed")
+        sys.exit(2)
+    if cfg.processes > 1:
+        # Worker timelines are only merged at the end: recovery could not end a trial
+        print(f"{Fore.YELLOW}[TRIALS]{Style.RESET_ALL} PROCESSES={cfg.processes} ignored, trials run in one process")
+        cfg = dataclasses.replace(cfg, processes=1)
+    at_s = cfg.failover_at_s if cfg.failover_at_s is not None else DEFAULT_FAILOVER_AT_S
+    client = rds_client(cfg.aws_region)
+
+    # Schema once; the ledger accumulates every trial's acknowledged writes
+    ledger = AckLedger.from_config(cfg)
+    events = EventSink.from_config(cfg)
+    try:
+        with connect(cfg, role="write") as conn:
+            conn.autocommit = True
+            ensure_schema(conn)
+            truncate(conn)
+            ensure_schema(conn, cfg)
+            vacuum(conn)
+    except Exception as e:
+        print(f"{Fore.RED}[START] Cannot connect to DB: {e}{Style.RESET_ALL}")
+        sys.exit(1)
+
+    print(f"{Fore.GREEN}[TRIALS]{Style.RESET_ALL} {cfg.trials} trials on {cfg.rds_instance_id}: "
+          f"failover at t+{at_s:g}s, {cfg.trial_settle_s:g}s settle, {cfg.trial_cooldown_s:g}s cooldown")
+    results = []
+    try:
+        for n in range(1, cfg.trials + 1):
+            if not wait_until_available(client, cfg.rds_instance_id, events):
+                print(f"{Fore.RED}[TRIALS]{Style.RESET_ALL} {cfg.rds_instance_id} not available, stopping")
+                break
+            state = DemoState()
+            state.acked = ledger
+            state.events = events
+            try:
+                with connect(cfg) as conn:
+                    state.first_fp = state.last_fp = server_fingerprint(conn)
+            except Exception as e:
+                print(f"{Fore.YELLOW}[TRIALS]{Style.RESET_ALL} fingerprint before trial {n} failed: {e}")
+            print(f"{Fore.GREEN}[TRIAL {n}/{cfg.trials}]{Style.RESET_ALL} writer_fingerprint={state.first_fp}")
+            events.start()
+            try:
+                result = run_trial(cfg, state, client, at_s)
+            finally:
+                events.stop()
+            result["trial"] = n
+            results.append(result)
+            print(f"{Fore.GREEN}[TRIAL {n}/{cfg.trials}]{Style.RESET_ALL} RTO={_fmt(result['rto_ms'])} ms "
+                  f"resume={_fmt(result['resume_ms'])} ms downtime={result['downtime_s']:.2f}s "
+                  f"writes={result['writes']} errors={result['write_errors']}")
+            if n < cfg.trials:
+                time.sleep(cfg.trial_cooldown_s)
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}[STOP]{Style.RESET_ALL} Trials interrupted by user")
+
+    # Only trials whose failover was accepted and recovered describe a failover
+    valid = [r for r in results if r["failover_accepted"] and r["recovered"]]
+    summary = {key: summarize([r[key] for r in valid]) for key, _, _ in METRICS}
+
+    rpo_zero = "UNKNOWN"
+    try:
+        with connect(cfg) as conn:
+            rpo = verify_rpo(conn, ledger, cfg.rpo_chunk)
+        color = Fore.GREEN if rpo.rpo_zero else Fore.RED
+        rpo_zero = (f"{color}{'YES' if rpo.rpo_zero else 'NO'}{Style.RESET_ALL} "
+                    f"({rpo.missing} of {rpo.acked} acknowledged writes missing over all trials)")
+    except Exception as e:
+        rpo_zero = f"UNKNOWN ({e})"
+    finally:
+        ledger.close()
+
+    print(f"\n{Fore.BLUE}==================== DB007 TRIALS REPORT ====================={Style.RESET_ALL}")
+    print(f"{'trial':>5} {'RTO ms':>9} {'resume ms':>10} {'detect ms':>10} {'down s':>8} {'p99 ms':>8} {'errors':>7}  writer")
+    for r in results:
+        note = "" if r["failover_accepted"] else " (failover rejected)"
+        if r["failover_accepted"] and not r["recovered"]:
+            note = " (not recovered)"
+        print(f"{r['trial']:>5} {_fmt(r['rto_ms']):>9} {_fmt(r['resume_ms']):>10} {_fmt(r['detection_ms']):>10} "
+              f"{r['downtime_s']:>8.2f} {_fmt(r['write_p99_ms']):>8} {r['write_errors']:>7}  "
+              f"{r['fp_before']} -> {r['fp_after']}{note}")
+    print(f"{Fore.BLUE}----------------- ACROSS {len(valid)} RECOVERED TRIALS ------------------{Style.RESET_ALL}")
+    for key, label, unit in METRICS:
+        s = summary[key]
+        if not s["n"]:
+            continue
+        ci = "" if s["n"] < 2 else f" 95% CI [{_fmt(s['ci95_low'], unit)}, {_fmt(s['ci95_high'], unit)}]"
+        print(f"{label:<27}: mean={_fmt(s['mean'], unit)} median={_fmt(s['median'], unit)} "
+              f"p95={_fmt(s['p95'], unit)} sd={_fmt(s['stdev'], unit)}{ci} {unit}")
+    print(f"RPO = 0 confirmed          : {rpo_zero}")
+    if cfg.trials_export:
+        try:
+            with open(cfg.trials_export, "w") as f:
+                json.dump({"failover_at_s": at_s, "trials": results, "summary": summary}, f, indent=2)
+            print(f"Trial results              : {cfg.trials_export}")
+        except OSError as e:
+            print(f"{Fore.RED}[END] Could not export trials: {e}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}==============================================================={Style.RESET_ALL}")
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,2 @@
 # Mission DB007 - Hybrid Utils Package
-__all__ = ["config", "state", "database", "aws", "loops"]
\ No newline at end of file
+__all__ = ["config", "state", "database", "aws", "loops", "pool", "aio", "multiproc", "histogram", "recorder", "timeline", "probe", "resolver", "scheduler", "profiles", "payload", "ledger", "verify", "staleness", "stats", "events", "counters", "prometheus", "deadlines"]
\ No newline at end of file
@@ -0,0 +1,262 @@
+import sys
+import time
+import asyncio
+from typing import Optional
+from colorama import Fore
+
+from .config import Config
+from .state import DemoState
+from .database import (
+    aconnect, aserver_fingerprint, ainsert_row, ainsert_rows, ainsert_row_fp, ainsert_rows_fp, acopy_rows,
+    aread_last_row, aread_count, payload_type,
+)
+from .payload import PayloadFactory
+from .resolver import connect_overrides, read_overrides
+from .scheduler import OpenLoopScheduler, make_scheduler
+from .loops import next_seq, probe_and_adopt, record_write_ok, record_write_error, record_read_ok, record_read_error, health_count_mode
+
+
+class _Generation:
+    """
+    Shared invalidation counter for the write coroutines.
+    Each coroutine keeps one warm session; the first error bumps the generation so
+    every other coroutine drops its (probably dead) session before its next write.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.probe_lock = asyncio.Lock()  # one probe group at a time
+        self.probed = -1                  # generation at the last successful probe
+
+    def bump(self):
+        self.value += 1
+
+
+async def _timed(state: DemoState, op: str, coro):
+    """Await coro and record its latency in the `op` histogram"""
+    t = time.perf_counter()
+    result = await coro
+    state.latency[op].record((time.perf_counter() - t) * 1000.0)
+    return result
+
+
+async def _close_quietly(conn):
+    if conn is None:
+        return
+    try:
+        await conn.close()
+    except Exception:
+        pass
+
+
+async def _sleep_until(state: DemoState, wake_at: float):
+    """Interruptible pacing (100ms chunks), same behaviour as the threaded loops"""
+    while not state.stop.is_set():
+        sleep_left = wake_at - time.perf_counter()
+        if sleep_left <= 0:
+            return
+        await asyncio.sleep(min(0.1, sleep_left))
+
+
+class _Session:
+    """One coroutine's write connection and its cached writer fingerprint"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.fp = None
+        self.fp_checked_at = 0.0
+
+
+async def _slot_start(state: DemoState, sched: Optional[OpenLoopScheduler]) -> Optional[float]:
+    """Start time of the next operation: now (closed loop) or the scheduled slot (open loop)"""
+    if sched is None:
+        return time.perf_counter()
+    slot = sched.next_slot()
+    await _sleep_until(state, slot)
+    if state.stop.is_set():
+        return None
+    sched.issued(slot)
+    return slot
+
+
+async def _write_once(cfg: Config, state: DemoState, session: _Session, payloads: PayloadFactory):
+    conn = session.conn
+    inline = cfg.fp_inline and cfg.write_mode != "copy"
+    max_age = cfg.fp_check_interval_s
+    if not inline and (session.fp is None or max_age <= 0 or time.monotonic() - session.fp_checked_at >= max_age):
+        session.fp = await _timed(state, "fingerprint", aserver_fingerprint(conn))
+        session.fp_checked_at = time.monotonic()
+    current_fp = session.fp
+    if current_fp:
+        state.last_fp = current_fp
+
+    # Returns the committed ids and their payloads (same order)
+    if cfg.write_mode == "row":
+        batch = [payloads.one(next_seq(state, 1))]
+        if not inline:
+            return [await _timed(state, "insert", ainsert_row(conn, batch[0], current_fp))], batch
+        ids, fp = await _timed(state, "insert", ainsert_row_fp(conn, batch[0]))
+    else:
+        batch = payloads.many(next_seq(state, cfg.batch_size), cfg.batch_size)
+        if not inline:
+            if cfg.write_mode == "copy":
+                return await _timed(state, "insert", acopy_rows(conn, batch, current_fp)), batch
+            return await _timed(state, "insert", ainsert_rows(conn, batch, current_fp, payload_type(cfg))), batch
+        ids, fp = await _timed(state, "insert", ainsert_rows_fp(conn, batch, payload_type(cfg)))
+
+    # Inline fingerprint: the row records the true writer
+    session.fp, session.fp_checked_at = fp, time.monotonic()
+    state.last_fp = fp
+    return ids, batch
+
+
+async def _bounded(coro, timeout_s: float, label: str):
+    """await `coro` within the operation's deadline (<= 0: unbounded), as a TimeoutError like the threads engine"""
+    if timeout_s <= 0:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout_s)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{label} watchdog exceeded {timeout_s:.2f}s (socket hang)")
+
+
+async def _read_once(state: DemoState, conn, mode: str):
+    last = await _timed(state, "last_row", aread_last_row(conn))
+    return last, await _timed(state, "count", aread_count(conn, mode, last))
+
+
+async def _write_worker(cfg: Config, state: DemoState, gen: _Generation, payloads: PayloadFactory,
+                        interval: float, deadline_s: float, share: int):
+    sched = make_scheduler(cfg, state, "write", 1.0 / interval if interval > 0 else 0.0, share)
+    attempt = 0
+    backoff = cfg.retry_backoff
+    session = None
+    conn_gen = gen.value
+
+    while not state.stop.is_set():
+        t0 = await _slot_start(state, sched)
+        if t0 is None:
+            break
+        try:
+            if session is not None and (conn_gen != gen.value or session.conn.closed):
+                await _close_quietly(session.conn)
+                session = None
+            if session is None:
+                conn_gen = gen.value
+                conn = await _timed(state, "connect", aconnect(cfg, role="write", **connect_overrides(state.resolver)))
+                await conn.set_autocommit(True)
+                session = _Session(conn)
+
+            # asyncio.wait_for is the watchdog: no helper thread per write
+            inserted_ids, written = await _bounded(_write_once(cfg, state, session, payloads), deadline_s, "WRITE")
+
+            if record_write_ok(state, inserted_ids, t0, written):
+                attempt = 0
+                backoff = cfg.retry_backoff
+
+            if sched is None:
+                await _sleep_until(state, t0 + interval)
+
+        except Exception as e:
+            gen.bump()
+            if state.resolver:
+                state.resolver.expire()
+            failed_gen = gen.value
+            if session is not None:
+                await _close_quietly(session.conn)
+            session = None
+            record_write_error(state, e)
+
+            attempt += 1
+            if cfg.retry_max and attempt > cfg.retry_max:
+                state.events.emit("WRITE", "Max retries reached, stopping.", "error", Fore.RED)
+                state.stop.set()
+                break
+
+            if cfg.failover_probe:
+                async with gen.probe_lock:
+                    if gen.probed >= failed_gen:
+                        continue  # another coroutine already found the writer
+                    # Probes are blocking threads: run them off the event loop
+                    loop = asyncio.get_running_loop()
+                    if await loop.run_in_executor(None, probe_and_adopt, cfg, state):
+                        gen.probed = gen.value
+                        continue
+
+            state.events.emit("WRITE", "RECONNECTING ⏳ backoff={backoff_s:.1f}s (attempt {attempt})", "warn",
+                              Fore.YELLOW, backoff_s=backoff, attempt=attempt)
+            await asyncio.sleep(backoff)
+            backoff = min(cfg.backoff_cap, backoff * 2 if backoff > 0 else cfg.retry_backoff)
+
+    if session is not None:
+        await _close_quietly(session.conn)
+
+
+async def _read_worker(cfg: Config, state: DemoState, interval: float, share: int):
+    attempt = 0
+    backoff = cfg.retry_backoff
+    sched = make_scheduler(cfg, state, "read", 1.0 / interval if interval > 0 else 0.0, share)
+
+    while not state.stop.is_set():
+        t0 = await _slot_start(state, sched)
+        if t0 is None:
+            break
+        try:
+            # Reconnect for each operation to detect failures quickly
+            conn = await _timed(state, "connect", aconnect(cfg, role="read", **read_overrides(cfg, state.resolver)))
+            mode = health_count_mode(cfg, state)
+            try:
+                seen_at = time.monotonic()
+                last, c = await _bounded(_read_once(state, conn, mode), cfg.read_deadline_s, "READ")
+            finally:
+                await _close_quietly(conn)
+            record_read_ok(state, c, last, t0, mode, seen_at)
+            attempt = 0
+            backoff = cfg.retry_backoff
+
+            if sched is None:
+                await _sleep_until(state, t0 + interval)
+
+        except Exception as e:
+            attempt += 1
+            if state.resolver:
+                state.resolver.expire()
+            record_read_error(state, e)
+            if cfg.retry_max and attempt > cfg.retry_max:
+                state.events.emit("READ", "Max retries reached, stopping.", "error", Fore.RED)
+                state.stop.set()
+                return
+
+            state.events.emit("READ", "RECONNECTING ⏳ backoff={backoff_s:.1f}s (attempt {attempt})", "warn",
+                              Fore.YELLOW, backoff_s=backoff, attempt=attempt)
+            await asyncio.sleep(backoff)
+            backoff = min(cfg.backoff_cap, backoff * 2 if backoff > 0 else cfg.retry_backoff)
+
+
+async def _run(cfg: Config, state: DemoState):
+    writers = max(1, cfg.async_writers)
+    readers = max(0, cfg.async_readers)
+
+    # WRITE_QPS / READ_QPS are totals shared by the coroutines
+    write_interval = writers / cfg.write_qps if cfg.write_qps > 0 else 0.2
+    if cfg.write_mode != "row":
+        # One batch per BATCH_FLUSH_S in total, as the threads engine: each coroutine flushes every writers * BATCH_FLUSH_S
+        write_interval = writers * cfg.batch_flush_s
+    read_interval = readers / cfg.read_qps if cfg.read_qps > 0 else 0.5
+    deadline_s = cfg.write_deadline_s
+
+    gen = _Generation()
+    payloads = PayloadFactory.from_config(cfg)  # shared: the coroutines run on one thread
+    tasks = [_write_worker(cfg, state, gen, payloads, write_interval, deadline_s, writers) for _ in range(writers)]
+    tasks += [_read_worker(cfg, state, read_interval, readers) for _ in range(readers)]
+    await asyncio.gather(*tasks)
+
+
+def run_async_engine(cfg: Config, state: DemoState):
+    """Run ASYNC_WRITERS write and ASYNC_READERS read coroutines on one event loop"""
+    # psycopg's async connections need a selector loop on Windows
+    loop = asyncio.SelectorEventLoop() if sys.platform == "win32" else asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_run(cfg, state))
+    finally:
+        loop.close()
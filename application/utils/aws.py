@@ -1,4 +1,11 @@
-from typing import Optional
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+from colorama import Fore, Style
 from .config import Config
 
 try:
@@ -6,16 +13,388 @@ try:
 except ImportError:
     boto3 = None
 
+# Error codes of the RDS API rate limiting
+THROTTLING_CODES = ("Throttling", "ThrottlingException", "RequestLimitExceeded", "TooManyRequestsException")
+
+# put_metric_data accepts at most 1000 datums per call
+MAX_DATUMS_PER_CALL = 1000
+# Client operations as named on the CloudWatch dashboard (cloudformation/db007-monitoring.yaml)
+CW_OPERATIONS = (("write", "INSERT"), ("read", "SELECT"))
+
+@lru_cache(maxsize=None)
+def rds_client(region: str):
+    """One RDS client per region for the whole run (boto3 clients are thread-safe)"""
+    return boto3.client("rds", region_name=region)
+
+@lru_cache(maxsize=None)
+def cloudwatch_client(region: str):
+    return boto3.client("cloudwatch", region_name=region)
+
 def get_rds_primary_az(cfg: Config) -> Optional[str]:
     """Get current primary AZ for RDS instance"""
     if not (cfg.aws_region and cfg.rds_instance_id and boto3):
         return None
-    
+
     try:
-        rds = boto3.client("rds", region_name=cfg.aws_region)
+        rds = rds_client(cfg.aws_region)
         resp = rds.describe_db_instances(DBInstanceIdentifier=cfg.rds_instance_id)
         dbi = resp["DBInstances"][0]
         return dbi.get("AvailabilityZone")
     except Exception as e:
         print(f"[RDS] Could not fetch AZ: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _is_throttling(e: Exception) -> bool:
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLING_CODES
+
+class RdsPoller:
+    """
+    Control-plane view of the failover.
+
+    Polls describe_db_instances and describe_events every `interval_s` with one
+    client and marks the instance status and AZ transitions and the new RDS events
+    on the outage timeline (kinds "rds_status", "rds_az", "rds_event") and as
+    [RDS] events. Event dates are wall clock: they are mapped onto the timeline's
+    monotonic clock. Throttled calls double the interval up to `backoff_cap_s`.
+    """
+
+    def __init__(self, client, instance_id: str, timeline, events, interval_s: float = 2.0,
+                 backoff_cap_s: float = 30.0):
+        self.client = client
+        self.instance_id = instance_id
+        self.timeline = timeline
+        self.events = events
+        self.interval_s = interval_s
+        self.backoff_cap_s = backoff_cap_s
+        self.status: Optional[str] = None
+        self.az: Optional[str] = None
+        self.polls = 0
+        self.throttled = 0
+        self._events_since = datetime.now(timezone.utc)
+        self._seen_events = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _instance(self):
+        dbi = self.client.describe_db_instances(DBInstanceIdentifier=self.instance_id)["DBInstances"][0]
+        status, az = dbi.get("DBInstanceStatus"), dbi.get("AvailabilityZone")
+        if status != self.status:
+            if self.status is not None:
+                self.timeline.mark("rds_status", f"{self.status} -> {status}")
+                self.events.emit("RDS", "status {old} -> {new}", "warn", Fore.BLUE, old=self.status, new=status)
+            self.status = status
+        if az != self.az:
+            if self.az is not None:
+                self.timeline.mark("rds_az", f"{self.az} -> {az}")
+                self.events.emit("RDS", "primary AZ {old} -> {new}", "warn", Fore.BLUE, old=self.az, new=az)
+            self.az = az
+
+    def _events(self):
+        resp = self.client.describe_events(
+            SourceIdentifier=self.instance_id, SourceType="db-instance", StartTime=self._events_since,
+        )
+        wall, mono = datetime.now(timezone.utc), time.monotonic()
+        for ev in sorted(resp.get("Events", []), key=lambda e: e["Date"]):
+            key = (ev["Date"], ev.get("Message"))
+            if key in self._seen_events:
+                continue  # StartTime is inclusive
+            self._seen_events.add(key)
+            self._events_since = max(self._events_since, ev["Date"])
+            at = mono - (wall - ev["Date"]).total_seconds()
+            self.timeline.mark("rds_event", ev.get("Message", ""), at=at)
+            self.events.emit("RDS", "event: {message}", "warn", Fore.BLUE, message=ev.get("Message", ""))
+
+    def poll_once(self):
+        self._instance()
+        self._events()
+        self.polls += 1
+
+    def _run(self):
+        delay = self.interval_s
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                delay = self.interval_s
+            except Exception as e:
+                if _is_throttling(e):
+                    self.throttled += 1
+                    delay = min(self.backoff_cap_s, delay * 2)
+                else:
+                    self.events.emit("RDS", "poll failed: {error}", "warn", Fore.YELLOW, error=str(e))
+            self._stop.wait(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rds-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def trigger_failover(client, instance_id: str, timeline, events) -> bool:
+    """
+    reboot_db_instance(ForceFailover=True), timestamped on the timeline's monotonic
+    clock: "failover_requested" before the call, then "failover_accepted" or
+    "failover_rejected" (e.g. the instance is not available yet), each answer also
+    emitted as a [FAILOVER] event.
+    """
+    timeline.mark("failover_requested", instance_id)
+    try:
+        client.reboot_db_instance(DBInstanceIdentifier=instance_id, ForceFailover=True)
+    except Exception as e:
+        timeline.mark("failover_rejected", str(e))
+        events.emit("FAILOVER", "reboot with failover rejected: {error}", "error", Fore.RED,
+                    instance=instance_id, error=str(e))
+        return False
+    timeline.mark("failover_accepted", instance_id)
+    events.emit("FAILOVER", "💥 reboot with failover requested for {instance}", "warn", Fore.MAGENTA,
+                instance=instance_id)
+    return True
+
+class FailoverTrigger:
+    """Triggers a failover `at_s` after start, then every `every_s` (0 = once)"""
+
+    def __init__(self, client, instance_id: str, timeline, events, at_s: float, every_s: float = 0.0):
+        self.client = client
+        self.instance_id = instance_id
+        self.timeline = timeline
+        self.events = events
+        self.at_s = at_s
+        self.every_s = every_s
+        self.requested = 0
+        self.accepted = 0
+        self.rejected = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        delay = self.at_s
+        while not self._stop.wait(delay):
+            self.requested += 1
+            if trigger_failover(self.client, self.instance_id, self.timeline, self.events):
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            if self.every_s <= 0:
+                return
+            delay = self.every_s
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="failover-trigger", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def wait_until_available(client, instance_id: str, events, timeout_s: float = 900.0, interval_s: float = 10.0) -> bool:
+    """Block until the instance reports "available" (a new failover is rejected before that)"""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            dbi = client.describe_db_instances(DBInstanceIdentifier=instance_id)["DBInstances"][0]
+            if dbi.get("DBInstanceStatus") == "available":
+                return True
+        except Exception as e:
+            if not _is_throttling(e):
+                events.emit("RDS", "status check failed: {error}", "warn", Fore.YELLOW, error=str(e))
+        if time.monotonic() + interval_s > deadline:
+            return False
+        time.sleep(interval_s)
+
+def start_failover_trigger(cfg: Config, state) -> Optional[FailoverTrigger]:
+    """Schedule the failovers of FAILOVER_AT_S / FAILOVER_EVERY_S (counted from the start of the traffic)"""
+    if cfg.failover_at_s is None and cfg.failover_every_s <= 0:
+        return None
+    if not (cfg.aws_region and cfg.rds_instance_id and boto3):
+        print(f"{Fore.YELLOW}[FAILOVER]{Style.RESET_ALL} AWS_REGION, RDS_INSTANCE_ID and boto3 are needed, not triggering")
+        return None
+    at_s = cfg.failover_at_s if cfg.failover_at_s is not None else cfg.failover_every_s
+    trigger = FailoverTrigger(rds_client(cfg.aws_region), cfg.rds_instance_id, state.timeline, state.events,
+                              at_s, cfg.failover_every_s)
+    trigger.start()
+    return trigger
+
+def start_rds_poller(cfg: Config, state) -> Optional[RdsPoller]:
+    """Start the control-plane poller when RDS_POLL_S > 0 and the instance is known"""
+    if cfg.rds_poll_s <= 0 or not (cfg.aws_region and cfg.rds_instance_id and boto3):
+        return None
+    poller = RdsPoller(rds_client(cfg.aws_region), cfg.rds_instance_id, state.timeline, state.events,
+                       cfg.rds_poll_s, cfg.rds_poll_backoff_cap_s)
+    poller.start()
+    return poller
+
+def _datum(name: str, dims: Dict[str, str], unit: str, value=None, stats=None) -> dict:
+    d = {"MetricName": name, "Dimensions": [{"Name": k, "Value": v} for k, v in dims.items()], "Unit": unit}
+    if stats is not None:
+        d["StatisticValues"] = stats
+    else:
+        d["Value"] = value
+    return d
+
+class ApiMetricSink:
+    """put_metric_data, in calls of up to MAX_DATUMS_PER_CALL datums"""
+
+    def __init__(self, client, namespace: str):
+        self.client = client
+        self.namespace = namespace
+        self.calls = 0
+
+    def publish(self, datums: List[dict], at: float):
+        stamp = datetime.fromtimestamp(at, timezone.utc)
+        for i in range(0, len(datums), MAX_DATUMS_PER_CALL):
+            batch = [dict(d, Timestamp=stamp) for d in datums[i:i + MAX_DATUMS_PER_CALL]]
+            self.client.put_metric_data(Namespace=self.namespace, MetricData=batch)
+            self.calls += 1
+
+    def close(self):
+        pass
+
+class EmfMetricSink:
+    """
+    CloudWatch Embedded Metric Format: one JSON line per dimension set, appended
+    to a file tailed by the CloudWatch agent into the log group (no API call).
+    EMF has no statistic sets: a StatisticValues datum is written as its average.
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.namespace = namespace
+        self._file = open(path, "a", encoding="utf-8")
+        self.calls = 0
+
+    def publish(self, datums: List[dict], at: float):
+        groups: Dict[tuple, dict] = {}
+        for d in datums:
+            dims = tuple((x["Name"], x["Value"]) for x in d["Dimensions"])
+            doc = groups.setdefault(dims, {"metrics": [], "values": {}})
+            st = d.get("StatisticValues")
+            value = st["Sum"] / st["SampleCount"] if st else d["Value"]
+            doc["metrics"].append({"Name": d["MetricName"], "Unit": d["Unit"]})
+            doc["values"][d["MetricName"]] = value
+        lines = []
+        for dims, doc in groups.items():
+            line = {
+                "_aws": {
+                    "Timestamp": int(at * 1000),
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace, "Dimensions": [[k for k, _ in dims]], "Metrics": doc["metrics"],
+                    }],
+                },
+                **dict(dims), **doc["values"],
+            }
+            lines.append(json.dumps(line))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        self.calls += 1
+
+    def close(self):
+        self._file.close()
+
+class CloudWatchPublisher:
+    """
+    Client-observed metrics pushed to CloudWatch once per `interval_s`.
+
+    Every interval aggregates, from the state's counters and latency histograms
+    (deltas since the previous interval, nothing is done per operation), the
+    metrics of the DB007 dashboard: DatabaseResponseTime (statistic set) and its
+    p99, Operations and Errors per Operation (INSERT / SELECT),
+    DatabaseConnectionStatus, and FailoverDuration / RecoveryTime when an outage
+    closed. The sink makes one call (or writes one EMF batch) per interval.
+    """
+
+    def __init__(self, state, sink, interval_s: float = 60.0):
+        self.state = state
+        self.sink = sink
+        self.interval_s = interval_s
+        self.failures = 0
+        self._prev = self._counters()
+        self._prev_latency = {op: state.latency[op].snapshot() for op, _ in CW_OPERATIONS}
+        self._outages_seen = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _counters(self):
+        s = self.state
+        return {"write": (s.write_count, s.write_errors), "read": (s.read_count, s.read_errors),
+                "downtime": s.total_downtime_s}
+
+    def collect(self) -> List[dict]:
+        """Datums of the interval since the previous call"""
+        s = self.state
+        counters = self._counters()
+        datums = []
+        for op, name in CW_OPERATIONS:
+            dims = {"Operation": name}
+            h = s.latency[op]
+            # Counts and sum from one snapshot: SampleCount and Sum describe the same samples
+            counts, total, sum_us = h.snapshot()
+            prev_counts, _, prev_sum = self._prev_latency[op]
+            self._prev_latency[op] = (counts, total, sum_us)
+            delta = h.since(prev_counts, counts)
+            if delta.total:
+                datums.append(_datum("DatabaseResponseTime", dims, "Milliseconds", stats={
+                    "SampleCount": delta.total, "Sum": (sum_us - prev_sum) / 1000.0,
+                    "Minimum": delta.percentile(0), "Maximum": delta.max_us / 1000.0,
+                }))
+                datums.append(_datum("DatabaseResponseTimeP99", dims, "Milliseconds", delta.percentile(99)))
+            done, errors = (c - p for c, p in zip(counters[op], self._prev[op]))
+            datums.append(_datum("Operations", dims, "Count", done))
+            datums.append(_datum("Errors", dims, "Count", errors))
+        down = s.fail_started_at is not None
+        datums.append(_datum("DatabaseConnectionStatus", {"Status": "Connected"}, "Count", 0 if down else 1))
+        datums.append(_datum("DatabaseConnectionStatus", {"Status": "Disconnected"}, "Count", 1 if down else 0))
+        outages = s.timeline.outages
+        for o in outages[self._outages_seen:]:
+            if o.first_ok_at is None:
+                break  # still open: reported once closed
+            datums.append(_datum("FailoverDuration", {"Event": "Failover"}, "Seconds", o.first_ok_at - o.first_error_at))
+            if o.rto_s is not None:
+                datums.append(_datum("RecoveryTime", {"Event": "Failover"}, "Seconds", o.rto_s))
+            self._outages_seen += 1
+        self._prev = counters
+        return datums
+
+    def publish_once(self):
+        datums = self.collect()
+        try:
+            self.sink.publish(datums, time.time())
+        except Exception as e:
+            self.failures += 1
+            self.state.events.emit("CLOUDWATCH", "publish failed ({n} datums dropped): {error}", "warn", Fore.YELLOW,
+                                   n=len(datums), error=str(e))
+
+    def _run(self):
+        next_at = time.monotonic() + self.interval_s
+        while not self._stop.wait(max(0.0, next_at - time.monotonic())):
+            self.publish_once()
+            next_at += self.interval_s
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="cloudwatch-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.publish_once()  # partial last interval
+        self.sink.close()
+
+def start_cloudwatch_publisher(cfg: Config, state, suffix: str = "") -> Optional[CloudWatchPublisher]:
+    """CW_METRICS=api (put_metric_data, needs AWS_REGION and boto3) or emf (CW_EMF_FILE for the agent)"""
+    if cfg.cw_metrics == "api":
+        if not (cfg.aws_region and boto3):
+            print(f"{Fore.YELLOW}[CLOUDWATCH]{Style.RESET_ALL} AWS_REGION and boto3 are needed, not publishing")
+            return None
+        sink = ApiMetricSink(cloudwatch_client(cfg.aws_region), cfg.cw_namespace)
+    elif cfg.cw_metrics == "emf":
+        stem, ext = os.path.splitext(cfg.cw_emf_file)
+        sink = EmfMetricSink(f"{stem}{suffix}{ext}", cfg.cw_namespace)
+    else:
+        return None
+    publisher = CloudWatchPublisher(state, sink, cfg.cw_interval_s)
+    publisher.start()
+    return publisher
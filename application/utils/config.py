@@ -4,9 +4,21 @@ import os
 import sys
 from dotenv import load_dotenv
 
+from .profiles import LoadProfile, parse_profile
+
 # Load .env file automatically
 load_dotenv()
 
+WRITE_MODES = ("row", "batch", "copy")
+ENGINES = ("threads", "asyncio")
+COUNT_MODES = ("max_id", "estimate", "exact")
+SCHEDULES = ("closed", "open")
+ARRIVALS = ("uniform", "poisson")
+CW_MODES = ("off", "api", "emf")
+
+def _bool(v) -> bool:
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
 def _env(name: str, default=None, cast=None):
     """Get environment variable with optional casting"""
     v = os.getenv(name, default)
@@ -23,6 +35,7 @@ class Config:
     db_name: str
     db_user: str
     db_password: str
+    db_reader_host: Optional[str] = None  # reads go here (replica / reader endpoint) instead of db_host
 
     # Mission parameters
     warmup_seconds: int = 20
@@ -30,14 +43,92 @@ class Config:
     write_qps: float = 5.0
     read_qps: float = 2.0
     
+    # Pacing
+    schedule: str = "closed"     # "closed" (wait after each op) | "open" (fixed timeline, latency from intended start)
+    arrivals: str = "uniform"    # open loop: "uniform" | "poisson"
+    max_lag_s: float = 1.0       # open loop: slots overdue by more than this are dropped as missed
+    late_threshold_ms: float = 10.0
+    write_profile: Optional[LoadProfile] = None  # rows/s over time (replaces WRITE_QPS, runs open loop)
+    read_profile: Optional[LoadProfile] = None   # reads/s over time (replaces READ_QPS, runs open loop)
+
     # Retry configuration
     retry_max: int = 0           # 0 = unlimited
     retry_backoff: float = 0.5   # seconds
     backoff_cap: float = 8.0     # seconds
 
+    # Endpoint resolution
+    dns_cache: bool = False            # resolve DB_HOST in the background, connect with hostaddr
+    dns_ttl_s: float = 1.0             # re-resolution period
+
+    # Writer fingerprint
+    fp_check_interval_s: float = 5.0   # re-check a warm session's fingerprint after this (0 = every write)
+    fp_inline: bool = False            # compute the fingerprint inside the INSERT (row/batch modes)
+
+    # Failover probing (instead of sleeping the backoff)
+    write_deadline_s: float = 2.0         # client-side deadline per write (0 = none); the session is closed past it
+    read_deadline_s: float = 5.0          # same for the health queries
+    failover_probe: bool = False
+    probe_parallelism: int = 3         # concurrent probes
+    probe_interval_s: float = 0.3      # delay between attempts of one probe (probes are staggered)
+    probe_connect_timeout: int = 2     # libpq connect_timeout (libpq rounds values below 2 up to 2)
+    probe_max_wait_s: float = 120.0    # give up and fall back to backoff after this
+
+    # Write path
+    write_mode: str = "row"      # "row" | "batch" (multi-row INSERT) | "copy" (COPY FROM STDIN)
+    batch_size: int = 500        # rows per batch (batch/copy modes)
+    batch_flush_s: float = 0.05  # seconds between batch flushes
+
+    # Payload and schema variant
+    payload_bytes: int = 0       # payload size in bytes (0 = minimal JSON, ~50 bytes)
+    payload_bytes_max: int = 0   # > payload_bytes: sizes drawn uniformly in [payload_bytes, payload_bytes_max]
+    payload_jsonb: bool = False  # payload column as JSONB instead of TEXT
+    extra_indexes: bool = False  # secondary indexes (ts_insert, writer_fingerprint, GIN on JSONB payloads)
+    wide_rows: bool = False      # 16 extra columns filled server-side by defaults
+
+    # Traffic engine
+    engine: str = "threads"      # "threads" (one writer + one reader thread) | "asyncio"
+    async_writers: int = 8       # concurrent write coroutines (asyncio engine)
+    async_readers: int = 1       # concurrent read coroutines (asyncio engine)
+    processes: int = 1           # >1: worker processes, each running the engine
+
+    # Health probe
+    count_mode: str = "max_id"   # "max_id" | "estimate" (pg stats) | "exact" (count(*), full scan)
+    count_exact_every: int = 0   # run an exact count every N reads (0 = never)
+
+    # Reporting
+    latency_export: Optional[str] = None  # JSON file for the latency histograms
+    timeline_export: Optional[str] = None # JSON file for the outage timeline
+    metrics_csv: Optional[str] = None     # per-interval time series (CSV)
+    metrics_interval_s: float = 1.0
+    metrics_capacity: int = 86400         # ring buffer size in samples (oldest overwritten)
+    metrics_port: int = 0                 # Prometheus /metrics endpoint (0 = off; workers use port + index)
+    metrics_host: str = "0.0.0.0"
+    metrics_min_interval_s: float = 1.0   # scrapes closer than this share one render
+    rpo_chunk: int = 1_000_000            # ids per chunk of the end-of-run RPO verification
+    ledger_hashes: bool = False           # keep a 4-byte payload hash per acknowledged write (not with JSONB)
+    ledger_file: Optional[str] = None     # memory-mapped spill file for the hashes of long runs
+    ledger_spill_mb: int = 64             # spill to LEDGER_FILE past this size
+    event_log: Optional[str] = None       # JSON lines of the run events (workers: -wN suffix)
+    console_refresh_s: float = 0.5        # console redraw period; [HEALTH] lines are coalesced in between
+
     # AWS configuration (optional)
     aws_region: Optional[str] = None
     rds_instance_id: Optional[str] = None
+    rds_poll_s: float = 0.0               # control-plane poll period (0 = off)
+    rds_poll_backoff_cap_s: float = 30.0  # max poll period while throttled
+    failover_at_s: Optional[float] = None # trigger a failover this long after the traffic starts
+    failover_every_s: float = 0.0         # then again every N seconds (0 = once)
+    cw_metrics: str = "off"               # "off" | "api" (put_metric_data) | "emf" (log lines for the agent)
+    cw_namespace: str = "DB007/Mission"   # MetricNamespace of cloudformation/db007-monitoring.yaml
+    cw_interval_s: float = 60.0           # one publication per interval
+    cw_emf_file: str = "emf.jsonl"        # EMF output (workers: -wN suffix)
+
+    # Repeated trials (trials.py)
+    trials: int = 5                       # load + failover cycles
+    trial_settle_s: float = 30.0          # traffic kept after the writes resume
+    trial_timeout_s: float = 600.0        # a trial without recovery is cut after this
+    trial_cooldown_s: float = 60.0        # pause once the instance is available again
+    trials_export: Optional[str] = None   # per-trial results and summary as JSON
 
 def load_config() -> Config:
     """Load configuration from environment variables"""
@@ -47,19 +138,112 @@ def load_config() -> Config:
         print(f"[CONFIG] Missing required env vars: {', '.join(missing)}")
         sys.exit(2)
 
+    write_mode = os.getenv("WRITE_MODE", "row")
+    if write_mode not in WRITE_MODES:
+        print(f"[CONFIG] WRITE_MODE must be one of: {', '.join(WRITE_MODES)}")
+        sys.exit(2)
+
+    engine = os.getenv("ENGINE", "threads")
+    if engine not in ENGINES:
+        print(f"[CONFIG] ENGINE must be one of: {', '.join(ENGINES)}")
+        sys.exit(2)
+
+    for name, allowed, default in (("SCHEDULE", SCHEDULES, "closed"), ("ARRIVALS", ARRIVALS, "uniform")):
+        if os.getenv(name, default) not in allowed:
+            print(f"[CONFIG] {name} must be one of: {', '.join(allowed)}")
+            sys.exit(2)
+
+    profiles = {}
+    for name in ("WRITE_PROFILE", "READ_PROFILE"):
+        spec = os.getenv(name)
+        try:
+            profiles[name] = parse_profile(spec) if spec else None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[CONFIG] {name} is not a valid load profile: {e}")
+            sys.exit(2)
+
+    count_mode = os.getenv("COUNT_MODE", "max_id")
+    if count_mode not in COUNT_MODES:
+        print(f"[CONFIG] COUNT_MODE must be one of: {', '.join(COUNT_MODES)}")
+        sys.exit(2)
+
+    cw_metrics = os.getenv("CW_METRICS", "off")
+    if cw_metrics not in CW_MODES:
+        print(f"[CONFIG] CW_METRICS must be one of: {', '.join(CW_MODES)}")
+        sys.exit(2)
+
     return Config(
         db_host=_env("DB_HOST"),
         db_port=_env("DB_PORT", cast=int),
         db_name=_env("DB_NAME"),
         db_user=_env("DB_USER"),
         db_password=_env("DB_PASSWORD"),
+        db_reader_host=_env("DB_READER_HOST"),
         warmup_seconds=_env("WARMUP_SECONDS", 20, int),
         runtime_seconds=_env("RUNTIME_SECONDS", 600, int),
         write_qps=_env("WRITE_QPS", 5.0, float),
         read_qps=_env("READ_QPS", 2.0, float),
+        schedule=_env("SCHEDULE", "closed"),
+        arrivals=_env("ARRIVALS", "uniform"),
+        max_lag_s=_env("MAX_LAG_S", 1.0, float),
+        late_threshold_ms=_env("LATE_THRESHOLD_MS", 10.0, float),
+        write_profile=profiles["WRITE_PROFILE"],
+        read_profile=profiles["READ_PROFILE"],
         retry_max=_env("RETRY_MAX", 0, int),
         retry_backoff=_env("RETRY_BACKOFF", 0.5, float),
         backoff_cap=_env("BACKOFF_CAP", 8.0, float),
+        dns_cache=_env("DNS_CACHE", False, _bool),
+        dns_ttl_s=_env("DNS_TTL_S", 1.0, float),
+        fp_check_interval_s=_env("FP_CHECK_INTERVAL_S", 5.0, float),
+        fp_inline=_env("FP_INLINE", False, _bool),
+        write_deadline_s=_env("WRITE_DEADLINE_S", 2.0, float),
+        read_deadline_s=_env("READ_DEADLINE_S", 5.0, float),
+        failover_probe=_env("FAILOVER_PROBE", False, _bool),
+        probe_parallelism=_env("PROBE_PARALLELISM", 3, int),
+        probe_interval_s=_env("PROBE_INTERVAL_S", 0.3, float),
+        probe_connect_timeout=_env("PROBE_CONNECT_TIMEOUT", 2, int),
+        probe_max_wait_s=_env("PROBE_MAX_WAIT_S", 120.0, float),
+        write_mode=write_mode,
+        batch_size=_env("BATCH_SIZE", 500, int),
+        batch_flush_s=_env("BATCH_FLUSH_S", 0.05, float),
+        payload_bytes=_env("PAYLOAD_BYTES", 0, int),
+        payload_bytes_max=_env("PAYLOAD_BYTES_MAX", 0, int),
+        payload_jsonb=_env("PAYLOAD_JSONB", False, _bool),
+        extra_indexes=_env("EXTRA_INDEXES", False, _bool),
+        wide_rows=_env("WIDE_ROWS", False, _bool),
+        engine=engine,
+        async_writers=_env("ASYNC_WRITERS", 8, int),
+        async_readers=_env("ASYNC_READERS", 1, int),
+        processes=_env("PROCESSES", 1, int),
+        count_mode=count_mode,
+        count_exact_every=_env("COUNT_EXACT_EVERY", 0, int),
+        latency_export=_env("LATENCY_EXPORT"),
+        timeline_export=_env("TIMELINE_EXPORT"),
+        metrics_csv=_env("METRICS_CSV"),
+        metrics_interval_s=_env("METRICS_INTERVAL_S", 1.0, float),
+        metrics_capacity=_env("METRICS_CAPACITY", 86400, int),
+        metrics_port=_env("METRICS_PORT", 0, int),
+        metrics_host=_env("METRICS_HOST", "0.0.0.0"),
+        metrics_min_interval_s=_env("METRICS_MIN_INTERVAL_S", 1.0, float),
+        rpo_chunk=_env("RPO_CHUNK", 1_000_000, int),
+        ledger_hashes=_env("LEDGER_HASHES", False, _bool),
+        ledger_file=_env("LEDGER_FILE"),
+        ledger_spill_mb=_env("LEDGER_SPILL_MB", 64, int),
+        event_log=_env("EVENT_LOG"),
+        console_refresh_s=_env("CONSOLE_REFRESH_S", 0.5, float),
         aws_region=_env("AWS_REGION"),
         rds_instance_id=_env("RDS_INSTANCE_ID"),
+        rds_poll_s=_env("RDS_POLL_S", 0.0, float),
+        rds_poll_backoff_cap_s=_env("RDS_POLL_BACKOFF_CAP_S", 30.0, float),
+        failover_at_s=_env("FAILOVER_AT_S", cast=float),
+        failover_every_s=_env("FAILOVER_EVERY_S", 0.0, float),
+        cw_metrics=cw_metrics,
+        cw_namespace=_env("CW_NAMESPACE", "DB007/Mission"),
+        cw_interval_s=_env("CW_INTERVAL_S", 60.0, float),
+        cw_emf_file=_env("CW_EMF_FILE", "emf.jsonl"),
+        trials=_env("TRIALS", 5, int),
+        trial_settle_s=_env("TRIAL_SETTLE_S", 30.0, float),
+        trial_timeout_s=_env("TRIAL_TIMEOUT_S", 600.0, float),
+        trial_cooldown_s=_env("TRIAL_COOLDOWN_S", 60.0, float),
+        trials_export=_env("TRIALS_EXPORT"),
     )
\ No newline at end of file
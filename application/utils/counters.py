@@ -0,0 +1,58 @@
+import threading
+from typing import List
+
+
+class ShardedCounter:
+    """
+    Counter updated from many threads without a lock on the hot path.
+
+    Every thread adds to its own shard (a one-item list only that thread writes),
+    found through a threading.local; reading sums the shards. The shard list is
+    copy-on-write, so the lock is only taken the first time a thread counts.
+    Shards outlive their threads: nothing counted is lost when a worker exits.
+    """
+
+    def __init__(self, initial=0):
+        self._zero = initial - initial  # 0 or 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[list] = [[initial]]
+
+    def _new_shard(self) -> list:
+        shard = [self._zero]
+        with self._lock:
+            self._shards = self._shards + [shard]
+        self._local.shard = shard
+        return shard
+
+    def _shard(self) -> list:
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._new_shard()
+
+    def add(self, n=1):
+        self._shard()[0] += n
+
+    @property
+    def value(self):
+        return sum(s[0] for s in self._shards)
+
+    def reset(self, value=0):
+        """Replace every shard with `value` (when no thread is counting, e.g. merging worker snapshots)"""
+        with self._lock:
+            self._shards = [[value]]
+            self._local = threading.local()
+
+
+class MaxCounter(ShardedCounter):
+    """Highest value seen by any thread (a slower thread never moves it backwards)"""
+
+    def update(self, v):
+        shard = self._shard()
+        if v > shard[0]:
+            shard[0] = v
+
+    @property
+    def value(self):
+        return max(s[0] for s in self._shards)
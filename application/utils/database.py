@@ -1,18 +1,105 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import psycopg
 from psycopg.rows import dict_row
 
 from .config import Config
 
-def connect(cfg: Config, *, role: str = "write"):  # role: "write" | "read"
-    """Create database connection with proper configuration"""
+INSERT_ROW_SQL = "INSERT INTO demo_events(payload, writer_fingerprint) VALUES (%s, %s) RETURNING id;"
+# Batch payloads travel as text[]: {payload_type} casts them to the payload column type
+INSERT_ROWS_SQL = (
+    "INSERT INTO demo_events(payload, writer_fingerprint) "
+    "SELECT p::{payload_type}, %s FROM unnest(%s::text[]) AS p RETURNING id;"
+)
+RESERVE_IDS_SQL = "SELECT nextval(pg_get_serial_sequence('demo_events', 'id')) AS id FROM generate_series(1, %s);"
+COPY_SQL = "COPY demo_events (id, payload, writer_fingerprint) FROM STDIN"
+# Health probe row counts: only "exact" scans the table
+COUNT_SQL = {
+    "exact": "SELECT count(*) AS c FROM demo_events;",
+    # Live tuple estimate from the stats collector, planner estimate as a fallback
+    "estimate": (
+        "SELECT COALESCE(s.n_live_tup, GREATEST(c.reltuples, 0))::bigint AS c "
+        "FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+        "WHERE c.oid = 'demo_events'::regclass;"
+    ),
+    # "max_id": no query, the last row (primary key index) gives max(id)
+}
+LAST_ROW_SQL = "SELECT id, writer_fingerprint, ts_insert FROM demo_events ORDER BY id DESC LIMIT 1;"
+FINGERPRINT_SQL = "SELECT inet_server_addr()::text AS ip, inet_server_port() AS port, version() AS ver;"
+# Same fingerprint as server_fingerprint(), computed server-side (parameter: client host)
+FINGERPRINT_EXPR = (
+    "concat(coalesce(inet_server_addr()::text, 'unknown-ip'), ':', coalesce(inet_server_port()::text, 'unknown-port'), "
+    "' pg', split_part(version(), ' ', 2), '@', %s::text)"
+)
+INSERT_ROW_FP_SQL = (
+    f"INSERT INTO demo_events(payload, writer_fingerprint) VALUES (%s, {FINGERPRINT_EXPR}) "
+    "RETURNING id, writer_fingerprint;"
+)
+INSERT_ROWS_FP_SQL = (
+    f"INSERT INTO demo_events(payload, writer_fingerprint) SELECT p::{{payload_type}}, {FINGERPRINT_EXPR} "
+    "FROM unnest(%s::text[]) AS p RETURNING id, writer_fingerprint;"
+)
+
+# End-of-run RPO verification (see utils.verify): per-chunk row counts in one pass over the table,
+# then an exact comparison against the acknowledged-id bitmap for the chunks that differ
+RANGE_COUNTS_SQL = "SELECT id / %s AS k, count(*) AS n FROM demo_events GROUP BY 1 ORDER BY 1;"
+# md5 prefix of the payload as an unsigned 32-bit integer (utils.ledger.payload_hash)
+PAYLOAD_HASH_EXPR = "('x' || lpad(substr(md5(payload::text), 1, 8), 16, '0'))::bit(64)::bigint"
+RANGE_HASHES_SQL = (
+    f"SELECT id / %s AS k, count(*) AS n, sum({PAYLOAD_HASH_EXPR}) AS h FROM demo_events GROUP BY 1 ORDER BY 1;"
+)
+CHUNK_DIFF_SQL = """
+WITH acked AS (
+  SELECT %(lo)s::bigint + i AS id FROM generate_series(0, %(n)s - 1) AS i WHERE get_bit(%(bits)s::bytea, i) = 1
+)
+SELECT 'missing' AS kind, count(*) AS n, (array_agg(a.id ORDER BY a.id))[1:10] AS sample
+  FROM acked a WHERE NOT EXISTS (SELECT 1 FROM demo_events e WHERE e.id = a.id)
+UNION ALL
+SELECT 'unexpected', count(*), (array_agg(e.id ORDER BY e.id))[1:10]
+  FROM demo_events e
+ WHERE e.id >= %(lo)s AND e.id < %(lo)s + %(n)s AND get_bit(%(bits)s::bytea, (e.id - %(lo)s)::int) = 0;
+"""
+# Acknowledged rows whose payload hash differs from the client's (4 bytes per id in %(hashes)s)
+CHUNK_ALTERED_SQL = """
+SELECT 'altered' AS kind, count(*) AS n, (array_agg(e.id ORDER BY e.id))[1:10] AS sample
+  FROM demo_events e
+ WHERE e.id >= %(lo)s AND e.id < %(lo)s + %(n)s AND get_bit(%(bits)s::bytea, (e.id - %(lo)s)::int) = 1
+   AND substr(md5(e.payload::text), 1, 8) <> encode(substring(%(hashes)s::bytea FROM (e.id - %(lo)s)::int * 4 + 1 FOR 4), 'hex');
+"""
+
+# Schema variants (see ensure_schema)
+PAYLOAD_TYPE_SQL = (
+    "SELECT format_type(atttypid, atttypmod) AS t FROM pg_attribute "
+    "WHERE attrelid = 'demo_events'::regclass AND attname = 'payload';"
+)
+WIDE_COLUMNS = [(f"attr_{i:02d}", "TEXT NOT NULL DEFAULT md5(random()::text)") for i in range(1, 9)] + [
+    (f"metric_{i:02d}", "BIGINT NOT NULL DEFAULT (random() * 1e9)::bigint") for i in range(1, 9)
+]
+EXTRA_INDEXES = [
+    ("demo_events_ts_insert_idx", "(ts_insert)"),
+    ("demo_events_writer_fp_idx", "(writer_fingerprint)"),
+    ("demo_events_payload_gin", "USING gin (payload jsonb_path_ops)"),  # jsonb payloads only
+]
+
+def _dsn(cfg: Config, role: str) -> str:
     tsa = "read-write" if role == "write" else "any"  # or "read-only" if using a reader endpoint
-    dsn = (
-        f"host={cfg.db_host} port={cfg.db_port} dbname={cfg.db_name} user={cfg.db_user} password={cfg.db_password} "
+    # Reads go to DB_READER_HOST (replica / reader endpoint) when it is set
+    host = cfg.db_reader_host if role == "read" and cfg.db_reader_host else cfg.db_host
+    return (
+        f"host={host} port={cfg.db_port} dbname={cfg.db_name} user={cfg.db_user} password={cfg.db_password} "
         f"sslmode=require connect_timeout=5 target_session_attrs={tsa} "
         f"options='-c statement_timeout=3000 -c lock_timeout=3000 -c idle_in_transaction_session_timeout=3000'"
     )
-    return psycopg.connect(dsn, row_factory=dict_row)
+
+def connect(cfg: Config, *, role: str = "write", **overrides):  # role: "write" | "read"
+    """
+    Create database connection with proper configuration.
+    `overrides` are libpq parameters replacing the defaults (e.g. hostaddr, connect_timeout).
+    """
+    return psycopg.connect(_dsn(cfg, role), row_factory=dict_row, **overrides)
+
+async def aconnect(cfg: Config, *, role: str = "write", **overrides):
+    """Async counterpart of connect() for the asyncio engine"""
+    return await psycopg.AsyncConnection.connect(_dsn(cfg, role), row_factory=dict_row, **overrides)
 
 # def connect(cfg: Config):
 #     """Create database connection with proper configuration"""
@@ -27,8 +114,16 @@ def connect(cfg: Config, *, role: str = "write"):  # role: "write" | "read"
 #     )
 #     return psycopg.connect(dsn, row_factory=dict_row)
 
-def ensure_schema(conn):
-    """Create demo table if it doesn't exist"""
+def payload_type(cfg: Config) -> str:
+    """SQL type of demo_events.payload for this run"""
+    return "jsonb" if cfg.payload_jsonb else "text"
+
+def ensure_schema(conn, cfg: Optional[Config] = None):
+    """
+    Create demo table if it doesn't exist, then converge it to the schema variant
+    of `cfg` (PAYLOAD_JSONB, EXTRA_INDEXES, WIDE_ROWS): a previous run's variant
+    would otherwise keep changing the row size and WAL volume.
+    """
     with conn.cursor() as cur:
         cur.execute("""
         CREATE TABLE IF NOT EXISTS demo_events (
@@ -38,6 +133,156 @@ def ensure_schema(conn):
           writer_fingerprint TEXT NOT NULL
         );
         """)
+        if cfg is None:
+            return
+
+        # Payload column type (rewrites the table when it changes; payloads are JSON)
+        wanted = payload_type(cfg)
+        cur.execute(PAYLOAD_TYPE_SQL)
+        if cur.fetchone()["t"] != wanted:
+            cur.execute(f"ALTER TABLE demo_events ALTER COLUMN payload TYPE {wanted} USING payload::{wanted};")
+
+        # Wide rows: extra columns filled server-side by their defaults
+        for name, definition in WIDE_COLUMNS:
+            if cfg.wide_rows:
+                cur.execute(f"ALTER TABLE demo_events ADD COLUMN IF NOT EXISTS {name} {definition};")
+            else:
+                cur.execute(f"ALTER TABLE demo_events DROP COLUMN IF EXISTS {name};")
+
+        # Secondary indexes: more WAL per row, as on a real table
+        for name, definition in EXTRA_INDEXES:
+            if cfg.extra_indexes and not (name.endswith("_gin") and wanted != "jsonb"):
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON demo_events {definition};")
+            else:
+                cur.execute(f"DROP INDEX IF EXISTS {name};")
+
+def insert_row(conn, payload: str, fp: str) -> int:
+    """Insert one event and return its id"""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ROW_SQL, (payload, fp))
+        return int(cur.fetchone()["id"])
+
+def insert_rows(conn, payloads: List[str], fp: str, payload_type: str = "text") -> List[int]:
+    """Insert a batch in a single multi-row INSERT round trip and return the new ids"""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ROWS_SQL.format(payload_type=payload_type), (fp, payloads))
+        return [int(r["id"]) for r in cur.fetchall()]
+
+def insert_row_fp(conn, payload: str) -> Tuple[List[int], str]:
+    """Insert one event, the server records its own fingerprint: returns ([id], fingerprint)"""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ROW_FP_SQL, (payload, conn.info.host))
+        row = cur.fetchone()
+        return [int(row["id"])], row["writer_fingerprint"]
+
+def insert_rows_fp(conn, payloads: List[str], payload_type: str = "text") -> Tuple[List[int], str]:
+    """Batch variant of insert_row_fp()"""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ROWS_FP_SQL.format(payload_type=payload_type), (conn.info.host, payloads))
+        rows = cur.fetchall()
+        return [int(r["id"]) for r in rows], (rows[0]["writer_fingerprint"] if rows else None)
+
+def copy_rows(conn, payloads: List[str], fp: str) -> List[int]:
+    """
+    Load a batch with COPY FROM STDIN and return the new ids.
+    COPY cannot RETURNING, so ids are reserved from the sequence first and
+    written explicitly: the RPO check still knows exactly what was committed.
+    """
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(RESERVE_IDS_SQL, (len(payloads),))
+        ids = [int(r["id"]) for r in cur.fetchall()]
+        with cur.copy(COPY_SQL) as copy:
+            for row_id, payload in zip(ids, payloads):
+                copy.write_row((row_id, payload, fp))
+    return ids
+
+async def ainsert_row(conn, payload: str, fp: str) -> int:
+    async with conn.cursor() as cur:
+        await cur.execute(INSERT_ROW_SQL, (payload, fp))
+        return int((await cur.fetchone())["id"])
+
+async def ainsert_rows(conn, payloads: List[str], fp: str, payload_type: str = "text") -> List[int]:
+    async with conn.cursor() as cur:
+        await cur.execute(INSERT_ROWS_SQL.format(payload_type=payload_type), (fp, payloads))
+        return [int(r["id"]) for r in await cur.fetchall()]
+
+async def ainsert_row_fp(conn, payload: str) -> Tuple[List[int], str]:
+    async with conn.cursor() as cur:
+        await cur.execute(INSERT_ROW_FP_SQL, (payload, conn.info.host))
+        row = await cur.fetchone()
+        return [int(row["id"])], row["writer_fingerprint"]
+
+async def ainsert_rows_fp(conn, payloads: List[str], payload_type: str = "text") -> Tuple[List[int], str]:
+    async with conn.cursor() as cur:
+        await cur.execute(INSERT_ROWS_FP_SQL.format(payload_type=payload_type), (conn.info.host, payloads))
+        rows = await cur.fetchall()
+        return [int(r["id"]) for r in rows], (rows[0]["writer_fingerprint"] if rows else None)
+
+async def acopy_rows(conn, payloads: List[str], fp: str) -> List[int]:
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute(RESERVE_IDS_SQL, (len(payloads),))
+        ids = [int(r["id"]) for r in await cur.fetchall()]
+        async with cur.copy(COPY_SQL) as copy:
+            for row_id, payload in zip(ids, payloads):
+                await copy.write_row((row_id, payload, fp))
+    return ids
+
+def read_last_row(conn):
+    """Newest row (primary key index scan)"""
+    with conn.cursor() as cur:
+        cur.execute(LAST_ROW_SQL)
+        return cur.fetchone()
+
+def read_count(conn, count_mode: str, last=None) -> int:
+    """
+    Row count for the health probe.
+    count_mode: "max_id" (O(1), taken from `last`), "estimate" (O(1), statistics) or "exact" (count(*), full scan)
+    """
+    if count_mode == "max_id":
+        return int(last["id"]) if last else 0
+    with conn.cursor() as cur:
+        cur.execute(COUNT_SQL[count_mode])
+        return int(cur.fetchone()["c"])
+
+async def aread_last_row(conn):
+    async with conn.cursor() as cur:
+        await cur.execute(LAST_ROW_SQL)
+        return await cur.fetchone()
+
+async def aread_count(conn, count_mode: str, last=None) -> int:
+    if count_mode == "max_id":
+        return int(last["id"]) if last else 0
+    async with conn.cursor() as cur:
+        await cur.execute(COUNT_SQL[count_mode])
+        return int((await cur.fetchone())["c"])
+
+def is_writable(conn) -> bool:
+    """True when the session is on a primary (not in recovery)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_is_in_recovery() AS r;")
+        return not cur.fetchone()["r"]
+
+def range_counts(conn, chunk: int, hashes: bool = False) -> Dict[int, Tuple[int, Optional[int]]]:
+    """Rows per id chunk, with the sum of their payload hashes if asked: {id // chunk: (count, hash sum)}"""
+    with conn.cursor() as cur:
+        cur.execute(RANGE_HASHES_SQL if hashes else RANGE_COUNTS_SQL, (chunk,))
+        return {int(r["k"]): (int(r["n"]), int(r["h"]) if hashes else None) for r in cur.fetchall()}
+
+def chunk_diff(conn, lo: int, n: int, bits: bytes,
+               hashes: Optional[bytes] = None) -> Dict[str, Tuple[int, List[int]]]:
+    """
+    Acknowledged ids of [lo, lo + n) absent from the table ("missing"), rows never
+    acknowledged ("unexpected") and, given the hashes, acknowledged rows whose
+    payload differs ("altered"): {kind: (count, sample)}
+    """
+    params = {"lo": lo, "n": n, "bits": bits, "hashes": hashes}
+    diff = {}
+    with conn.cursor() as cur:
+        for sql in (CHUNK_DIFF_SQL, CHUNK_ALTERED_SQL) if hashes is not None else (CHUNK_DIFF_SQL,):
+            cur.execute(sql, params)
+            for r in cur.fetchall():
+                diff[r["kind"]] = (int(r["n"]), [int(i) for i in (r["sample"] or [])])
+    return diff
 
 def truncate(conn):
     with conn.cursor() as cur:
@@ -47,12 +292,19 @@ def vacuum(conn):
     with conn.cursor() as cur:
         cur.execute("VACUUM FULL demo_events;")
 
+def _format_fingerprint(row, host) -> str:
+    ip = row["ip"] or "unknown-ip"
+    port = row["port"] or "unknown-port"
+    ver = row["ver"].split()[1] if row and row["ver"] else "unknown-ver"
+    return f"{ip}:{port} pg{ver}@{host}"
+
 def server_fingerprint(conn) -> str:
     """Get unique server fingerprint for failover detection"""
     with conn.cursor() as cur:
-        cur.execute("SELECT inet_server_addr()::text AS ip, inet_server_port() AS port, version() AS ver;")
-        row = cur.fetchone()
-        ip = row["ip"] or "unknown-ip"
-        port = row["port"] or "unknown-port"
-        ver = row["ver"].split()[1] if row and row["ver"] else "unknown-ver"
-        return f"{ip}:{port} pg{ver}@{conn.info.host}"
\ No newline at end of file
+        cur.execute(FINGERPRINT_SQL)
+        return _format_fingerprint(cur.fetchone(), conn.info.host)
+
+async def aserver_fingerprint(conn) -> str:
+    async with conn.cursor() as cur:
+        await cur.execute(FINGERPRINT_SQL)
+        return _format_fingerprint(await cur.fetchone(), conn.info.host)
\ No newline at end of file
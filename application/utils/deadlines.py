@@ -0,0 +1,131 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    One supervised operation, used as a context manager around the blocking call.
+
+    If the supervisor closed the connection because the deadline passed, the
+    error this causes in the blocked call is re-raised as a TimeoutError.
+    Finishing and expiring take the deadline's lock: either the operation ends
+    first and its connection is left alone, or it sees the expiry on exit.
+    """
+
+    __slots__ = ("supervisor", "conn", "timeout_s", "label", "at", "done", "expired", "_lock")
+
+    def __init__(self, supervisor: "DeadlineSupervisor", conn, timeout_s: float, label: str):
+        self.supervisor = supervisor
+        self.conn = conn
+        self.timeout_s = timeout_s
+        self.label = label
+        self.at = time.monotonic() + timeout_s
+        self.done = False
+        self.expired = False
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "Deadline":
+        self.supervisor._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.done = True  # the supervisor drops it from the heap lazily
+        if self.expired and exc is not None:
+            raise TimeoutError(
+                f"{self.label} watchdog exceeded {self.timeout_s:.2f}s (socket hang, connection closed)"
+            ) from exc
+        return False
+
+
+class DeadlineSupervisor:
+    """
+    Single thread enforcing the client-side deadlines of every in-flight operation.
+
+    Deadlines sit in a heap; finished ones are only flagged and popped when they
+    reach the top, so a write costs one heap push and no thread. The thread
+    sleeps until the earliest deadline, and wakes about once per timeout period
+    under load. On expiry the session is closed, as the per-write watchdog
+    thread did: conn.cancel() would need a round trip to a server that is
+    likely gone, on the one thread that guards all the others.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.expired = 0
+
+    def guard(self, conn, timeout_s: float, label: str = "OP") -> Deadline:
+        return Deadline(self, conn, timeout_s, label)
+
+    def _push(self, d: Deadline):
+        with self._cond:
+            heapq.heappush(self._heap, (d.at, next(self._seq), d))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="deadline-supervisor", daemon=True)
+                self._thread.start()
+            elif self._heap[0][2] is d:
+                self._cond.notify()  # earlier than what the thread sleeps on
+
+    def _next_expired(self) -> Deadline:
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2].done:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                return heapq.heappop(self._heap)[2]
+
+    def _expire(self, d: Deadline) -> bool:
+        """Close the connection of `d` unless its operation already finished"""
+        with d._lock:
+            if d.done:
+                return False
+            d.expired = True
+            try:
+                # Unblocks the caller: its socket wait fails and __exit__ turns it into a TimeoutError
+                d.conn.close()
+            except Exception:
+                pass
+        self.expired += 1
+        return True
+
+    def _run(self):
+        while True:
+            self._expire(self._next_expired())
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+
+_supervisor: Optional[DeadlineSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def supervisor() -> DeadlineSupervisor:
+    """The process-wide supervisor (shared by every loop and worker thread)"""
+    global _supervisor
+    if _supervisor is None:
+        with _supervisor_lock:
+            if _supervisor is None:
+                _supervisor = DeadlineSupervisor()
+    return _supervisor
+
+
+def guard(conn, timeout_s: float, label: str = "OP"):
+    """Context manager bounding a blocking call on `conn` to `timeout_s` (<= 0: unbounded)"""
+    if timeout_s <= 0:
+        return contextlib.nullcontext()
+    return supervisor().guard(conn, timeout_s, label)
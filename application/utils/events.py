@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from colorama import Style
+
+class EventSink:
+    """
+    Run events, off the measured path.
+
+    emit() only appends a tuple to a deque (atomic in CPython, no lock): the
+    message template is formatted by the background writer, which drains the
+    queue every `refresh_s`, appends one JSON line per event to `path` (monotonic
+    and wall timestamps, fields as keys) and renders the console: warn / error
+    events in full, info events (e.g. [HEALTH]) coalesced to the latest one per
+    tag. Past `capacity` queued events the oldest are dropped (and counted).
+    Until start() events are printed synchronously.
+    """
+
+    def __init__(self, path: Optional[str] = None, refresh_s: float = 0.5, capacity: int = 100_000, stream=None):
+        self.path = path
+        self.refresh_s = refresh_s
+        self.capacity = capacity
+        self.stream = stream or sys.stdout
+        self.dropped = 0
+        self._queue = deque(maxlen=capacity)
+        self._file = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, cfg, suffix: str = "") -> "EventSink":
+        path = None
+        if cfg.event_log:
+            stem, ext = os.path.splitext(cfg.event_log)
+            path = f"{stem}{suffix}{ext or '.jsonl'}"
+        return cls(path, cfg.console_refresh_s)
+
+    def emit(self, tag: str, text: str, level: str = "info", color: str = "", **fields):
+        """Queue an event; `text` is a str.format() template over `fields`"""
+        event = (time.monotonic(), time.time(), tag, level, color, text, fields)
+        if self._thread is None:
+            self.stream.write(self._render(event) + "\n")
+            return
+        if len(self._queue) == self.capacity:
+            self.dropped += 1
+        self._queue.append(event)
+
+    @staticmethod
+    def _render(event) -> str:
+        _, _, tag, _, color, text, fields = event
+        try:
+            msg = text.format(**fields)
+        except (KeyError, IndexError, ValueError):
+            msg = f"{text} {fields}"
+        return f"{color}[{tag}]{Style.RESET_ALL} {msg}" if color else f"[{tag}] {msg}"
+
+    def _drain(self):
+        lines, latest = [], {}
+        records = [] if self._file is not None else None
+        while True:
+            try:
+                event = self._queue.popleft()
+            except IndexError:
+                break
+            mono, wall, tag, level, _, text, fields = event
+            if records is not None:
+                try:
+                    msg = text.format(**fields)
+                except (KeyError, IndexError, ValueError):
+                    msg = text
+                records.append(json.dumps(
+                    {"mono": round(mono, 6), "wall": round(wall, 6), "tag": tag, "level": level, "msg": msg, **fields},
+                    default=str,
+                ))
+            if level == "info":
+                prev = latest.get(tag)
+                latest[tag] = (event, prev[1] + 1 if prev else 1)
+            else:
+                lines.append(self._render(event))
+        for event, n in latest.values():
+            lines.append(self._render(event) + (f" (+{n - 1} more)" if n > 1 else ""))
+        if records:
+            self._file.write("\n".join(records) + "\n")
+            self._file.flush()
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_s):
+            try:
+                self._drain()
+            except (OSError, ValueError) as e:
+                self.stream.write(f"[EVENTS] writer failed: {e}\n")
+
+    def start(self):
+        if self.path:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer after a last drain; later events print synchronously again"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.dropped:
+            self.stream.write(f"[EVENTS] {self.dropped} events dropped (queue full)\n")
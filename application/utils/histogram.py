@@ -0,0 +1,271 @@
+import json
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+# Log-linear buckets (HDR style): values are recorded in microseconds, exact below
+# 2*SUB_BUCKETS and with < 1/SUB_BUCKETS relative error above. Memory is fixed:
+# one int64 per bucket and recording thread, whatever the number of samples.
+SUB_BUCKETS = 128
+_SUB_BITS = SUB_BUCKETS.bit_length() - 1
+MAX_VALUE_US = 3600 * 1_000_000  # one hour; larger values are clamped
+BUCKETS = (MAX_VALUE_US.bit_length() - _SUB_BITS + 1) * SUB_BUCKETS
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def _index(v: int) -> int:
+    if v < 2 * SUB_BUCKETS:
+        return v
+    shift = v.bit_length() - _SUB_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (v >> shift) - SUB_BUCKETS
+
+
+def _upper_value(i: int) -> int:
+    """Highest value (us) that falls in bucket i"""
+    if i < 2 * SUB_BUCKETS:
+        return i
+    shift = i // SUB_BUCKETS - 1
+    sub = i % SUB_BUCKETS + SUB_BUCKETS
+    return ((sub + 1) << shift) - 1
+
+
+class _Shard:
+    """One recording thread's buckets; `version` is odd while its owner is in record()"""
+
+    __slots__ = ("counts", "total", "sum_us", "max_us", "version")
+
+    def __init__(self):
+        self.counts = array("q", bytes(8 * BUCKETS))
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+        self.version = 0
+
+    def read(self) -> Tuple[array, int, int, int]:
+        """Consistent (copy of counts, total, sum_us, max_us), without stopping the owner"""
+        while True:
+            v = self.version
+            if not v & 1:
+                out = array("q", self.counts), self.total, self.sum_us, self.max_us
+                if self.version == v:
+                    return out
+            time.sleep(0)  # the owner was interrupted mid-record: let it finish
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram recording milliseconds with microsecond resolution.
+
+    record() takes no lock: like utils.counters.ShardedCounter, every thread
+    writes its own shard (found through a threading.local) and readers fold the
+    shards. A shard's version counter lets a reader copy it consistently while
+    its owner keeps recording. Merged or loaded samples live in a base shard.
+    """
+
+    UNIT = 1000.0   # recorded values per reported unit (us per ms)
+    SUFFIX = "_ms"  # summary() key suffix
+
+    def __init__(self):
+        self._lock = threading.Lock()  # shard list (copy-on-write) and merges
+        self._local = threading.local()
+        self._base = _Shard()
+        self._shards = [self._base]
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._lock:
+                self._shards = self._shards + [shard]
+            self._local.shard = shard
+            return shard
+
+    def record(self, ms: float):
+        v = min(MAX_VALUE_US, max(0, int(ms * self.UNIT)))
+        i = _index(v)
+        shard = self._shard()
+        shard.version += 1
+        shard.counts[i] += 1
+        shard.total += 1
+        shard.sum_us += v
+        if v > shard.max_us:
+            shard.max_us = v
+        shard.version += 1
+
+    def _fold(self) -> Tuple[array, int, int, int]:
+        """(counts, total, sum_us, max_us) over every shard; each sample is in it whole or not at all"""
+        shards = self._shards
+        counts, total, sum_us, max_us = shards[0].read()
+        for shard in shards[1:]:
+            c, t, s, m = shard.read()
+            if not t:
+                continue
+            for i, n in enumerate(c):
+                if n:
+                    counts[i] += n
+            total, sum_us, max_us = total + t, sum_us + s, max(max_us, m)
+        return counts, total, sum_us, max_us
+
+    @property
+    def counts(self) -> array:
+        """Copy of the bucket counts (all shards)"""
+        return self._fold()[0]
+
+    @property
+    def total(self) -> int:
+        return sum(s.total for s in self._shards)
+
+    @property
+    def sum_us(self) -> int:
+        return sum(s.sum_us for s in self._shards)
+
+    @property
+    def max_us(self) -> int:
+        return max(s.max_us for s in self._shards)
+
+    def _percentile(self, counts: array, total: int, max_us: int, p: float) -> float:
+        if total == 0:
+            return 0.0
+        rank = max(1, math.ceil(total * p / 100.0))
+        seen = 0
+        for i, c in enumerate(counts):
+            if c:
+                seen += c
+                if seen >= rank:
+                    return min(_upper_value(i), max_us) / self.UNIT
+        return max_us / self.UNIT
+
+    def percentile(self, p: float) -> float:
+        """Value in ms at percentile p (0-100); 0.0 when empty"""
+        counts, total, _, max_us = self._fold()
+        return self._percentile(counts, total, max_us, p)
+
+    def mean(self) -> float:
+        _, total, sum_us, _ = self._fold()
+        return (sum_us / total) / self.UNIT if total else 0.0
+
+    def merge(self, other: "LatencyHistogram"):
+        counts, total, sum_us, max_us = other._fold()
+        with self._lock:
+            base = self._base
+            base.version += 1
+            for i, c in enumerate(counts):
+                if c:
+                    base.counts[i] += c
+            base.total += total
+            base.sum_us += sum_us
+            base.max_us = max(base.max_us, max_us)
+            base.version += 1
+
+    def summary(self) -> Dict[str, float]:
+        counts, total, sum_us, max_us = self._fold()
+        mean = (sum_us / total) / self.UNIT if total else 0.0
+        out = {"count": total, f"mean{self.SUFFIX}": round(mean, 3)}
+        for p in PERCENTILES:
+            out[f"p{p:g}{self.SUFFIX}"] = round(self._percentile(counts, total, max_us, p), 3)
+        out[f"max{self.SUFFIX}"] = max_us / self.UNIT
+        return out
+
+    def cumulative(self, bounds_ms: Iterable[float]) -> list:
+        """Samples <= each bound (ascending, ms), in one pass over the buckets"""
+        bounds = [int(b * self.UNIT) for b in bounds_ms]
+        out = [0] * len(bounds)
+        counts = self.counts  # consistent copy while record() goes on
+        seen, k = 0, 0
+        for i, c in enumerate(counts):
+            if not c:
+                continue
+            upper = _upper_value(i)
+            while k < len(bounds) and upper > bounds[k]:
+                out[k] = seen
+                k += 1
+            if k == len(bounds):
+                break
+            seen += c
+        for j in range(k, len(bounds)):
+            out[j] = seen
+        return out
+
+    def snapshot(self) -> Tuple[array, int, int]:
+        """(copy of .counts, total, sum_us) describing the same samples"""
+        counts, total, sum_us, _ = self._fold()
+        return counts, total, sum_us
+
+    def since(self, prev_counts: array, counts: array) -> "LatencyHistogram":
+        """
+        Histogram of the samples between two copies of .counts (`prev_counts`, then `counts`).
+        Diff against a copy, not the live counts: the copy becomes the next baseline, so
+        no sample recorded in between is lost.
+        """
+        h = type(self)()
+        base = h._base
+        top = -1
+        for i, (c, p) in enumerate(zip(counts, prev_counts)):
+            if c != p:
+                base.counts[i] = c - p
+                base.total += c - p
+                top = i
+        if top >= 0:
+            base.max_us = min(_upper_value(top), self.max_us)
+        return h
+
+    def to_dict(self) -> dict:
+        """Sparse, picklable/JSON form (only non-empty buckets)"""
+        counts, total, sum_us, max_us = self._fold()
+        return {
+            "total": total,
+            "sum_us": sum_us,
+            "max_us": max_us,
+            "buckets": {i: c for i, c in enumerate(counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        h = cls()
+        base = h._base
+        for i, c in d["buckets"].items():
+            base.counts[int(i)] = c
+        base.total = d["total"]
+        base.sum_us = d["sum_us"]
+        base.max_us = d["max_us"]
+        return h
+
+
+class CountHistogram(LatencyHistogram):
+    """Same buckets for unit-free counts (e.g. ids a read was behind): exact up to 256, clamped at MAX_VALUE_US"""
+
+    UNIT = 1.0
+    SUFFIX = ""
+
+
+def format_summary(name: str, h: LatencyHistogram) -> str:
+    """One report line: name, count and the standard percentiles"""
+    s = h.summary()
+    tail = " ".join(f"p{p:g}={s[f'p{p:g}_ms']:.1f}" for p in PERCENTILES)
+    return f"{name:<12} n={s['count']:<8} {tail} max={s['max_ms']:.1f} ms"
+
+
+def merge_all(dicts: Iterable[Optional[dict]], cls=LatencyHistogram) -> LatencyHistogram:
+    h = cls()
+    for d in dicts:
+        if d:
+            h.merge(cls.from_dict(d))
+    return h
+
+
+def export_json(path: str, histograms: Dict[str, LatencyHistogram]):
+    """Write percentiles and raw buckets (reloadable with LatencyHistogram.from_dict)"""
+    doc = {
+        "unit": "us",
+        "sub_buckets": SUB_BUCKETS,
+        "operations": {
+            op: {"summary": h.summary(), "histogram": h.to_dict()}
+            for op, h in histograms.items() if h.total
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
@@ -1,104 +1,219 @@
 import time
-import uuid
-import json
-import threading
-from datetime import datetime, timezone
-from colorama import Fore, Style
+from typing import Optional
+from colorama import Fore
 
 from .config import Config
 from .state import DemoState
-from .database import connect, server_fingerprint
+from .database import (
+    connect, server_fingerprint, insert_row, insert_rows, insert_row_fp, insert_rows_fp, copy_rows,
+    read_last_row, read_count, payload_type,
+)
+from .payload import PayloadFactory
+from .pool import WritePool
+from .probe import probe_writer
+from .resolver import read_overrides
+from .scheduler import OpenLoopScheduler, make_scheduler
+from .deadlines import guard
 
 
 # --- Watchdog helper for WRITE ------------------------------------------------
-def _write_once_with_deadline(cfg: Config, state: DemoState, deadline_s: float = 2.0):
+def _write_once_with_deadline(cfg: Config, state: DemoState, pool: WritePool, payloads: PayloadFactory,
+                              deadline_s: float = 2.0):
     """
-    Executes an INSERT ... RETURNING in a thread and imposes a client-side timeout.
-    If the timeout expires (socket blocked), the connection is closed to force an exception
-    and a TimeoutError is raised to activate the upstream reconnection logic.
+    Executes an INSERT ... RETURNING (or a batch, see WRITE_MODE) under a client-side
+    deadline kept by the process-wide DeadlineSupervisor (no thread per write).
+    If the deadline expires (socket blocked), the supervisor closes the connection to
+    force an exception, raised as a TimeoutError to activate the upstream reconnection logic.
+    Any failure evicts the session and invalidates the whole write pool.
+    Returns the ids committed by this call and their payloads (same order).
     """
-    conn = connect(cfg, role="write")
-    conn.autocommit = True
+    with pool.session() as conn:
+        return _write_on_session(cfg, conn, state, pool, payloads, deadline_s)
 
-    # Current fingerprint (and refreshes the last observed fingerprint)
-    current_fp = server_fingerprint(conn)
-    state.last_fp = current_fp
 
-    result = {"ok": False, "err": None, "inserted_id": None}
+# --- Bookkeeping shared by every engine (threads, asyncio) -------------------
+def timed(state: DemoState, op: str, fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) and record its latency in the `op` histogram"""
+    t = time.perf_counter()
+    result = fn(*args, **kwargs)
+    state.latency[op].record((time.perf_counter() - t) * 1000.0)
+    return result
 
-    def _do_write():
-        try:
-            with conn.cursor() as cur:
-                payload = {
-                    "uuid": str(uuid.uuid4()),
-                    "at": datetime.now(timezone.utc).isoformat(),
-                    "seq": state.write_count + 1,
-                }
-                # print(f"{Fore.YELLOW}[WRITE-DEBUG]{Style.RESET_ALL} Starting INSERT...")
-                cur.execute(
-                    "INSERT INTO demo_events(payload, writer_fingerprint) VALUES (%s, %s) RETURNING id;",
-                    (json.dumps(payload), current_fp),
-                )
-                # print(f"{Fore.YELLOW}[WRITE-DEBUG]{Style.RESET_ALL} INSERT done, fetching result...")
-                row = cur.fetchone()
-                # print(f"{Fore.GREEN}[WRITE-DEBUG]{Style.RESET_ALL} Operation completed!")
-                result["inserted_id"] = int(row["id"])
-                result["ok"] = True
-        except Exception as e:
-            result["err"] = e
 
-    t = threading.Thread(target=_do_write, daemon=True)
-    t.start()
-    t.join(timeout=deadline_s)
+def next_seq(state: DemoState, n: int) -> int:
+    """
+    First of `n` unique payload sequence numbers, without a lock: next() on the
+    state's itertools.count hands out block k = [k*n + 1, (k+1)*n] (n is the same
+    for every write of a run, so blocks never overlap).
+    """
+    return next(state.seq) * n + 1
 
-    if t.is_alive():
-        # The INSERT is probably blocked at the socket level: we force a "clean" failure.
-        try:
-            conn.close()
-        except Exception:
-            pass
-        # Let the thread finish now that the socket is closed
-        t.join(timeout=1.0)
-        raise TimeoutError(f"WRITE watchdog exceeded {deadline_s:.2f}s (socket hang)")
 
-    # The thread has finished (success or exception)
-    try:
-        conn.close()
-    except Exception:
-        pass
+def record_write_ok(state: DemoState, inserted_ids, t0: float, payloads=None) -> bool:
+    """
+    Account for committed ids (and their payloads, same order); returns True when this write ends an outage.
+
+    Counters, histogram, ack clock and timeline take no lock here; AckLedger.add
+    does (shared bitmap bytes), and the outage lock is only taken to close an outage.
+    """
+    top = max(inserted_ids)
+    state.newest_id.update(top)
+    state.acked.add(inserted_ids, payloads)
+    state.acks.ack(top)
+    state.writes.add(len(inserted_ids))
+    state.last_latency_ms = (time.perf_counter() - t0) * 1000.0
+    state.latency["write"].record(state.last_latency_ms)
+    state.timeline.write_ok(state.last_fp)
+
+    # Recovery detection (the lock only when an outage is open: one writer closes it)
+    if state.fail_started_at is None:
+        return False
+    with state.outage_lock:
+        started = state.fail_started_at
+        if started is None:
+            return False
+        now = time.monotonic()
+        state.downtime.add(now - started)
+        state.downtime_windows.append((started, now))
+        state.fail_started_at = None
+    state.events.emit("RECOVERY", "WRITE RESUMED ✅ after {downtime_s:.2f}s", "warn", Fore.GREEN, downtime_s=now - started)
+    return True
+
+
+def record_write_error(state: DemoState, e: Exception):
+    """Failover detection: the first error opens the outage window"""
+    state.write_fails.add()
+    state.timeline.write_failed(e)
+    with state.outage_lock:
+        opened = state.fail_started_at is None
+        if opened:
+            # monotonic (not perf_counter): windows are compared across worker processes
+            state.fail_started_at = time.monotonic()
+            state.last_id_before_error = state.last_id
+    if opened:
+        state.events.emit("WRITE", "FAILOVER DETECTED ⚠️ {error}", "error", Fore.RED, error=str(e).strip())
+    else:
+        state.events.emit("WRITE", "STILL DOWN ⚠️ {error}", "warn", Fore.YELLOW, error=str(e).strip())
+
+
+def record_read_error(state: DemoState, e: Exception):
+    state.read_fails.add()
+    state.events.emit("READ", "PAUSED ⚠️ {error}", "warn", Fore.YELLOW, error=str(e).strip())
+
+
+# [HEALTH] line (formatted by the event writer, not the read loop)
+HEALTH = ("writes={writes} reads={reads} count{approx}={count} last_id={last_id} last_fp={last_fp:.20}... "
+          "latency_ms={latency_ms:.1f}")
+HEALTH_STALE = HEALTH + " stale={stale_ids}ids/{stale_ms:.0f}ms"
+
+
+def health_count_mode(cfg: Config, state: DemoState) -> str:
+    """COUNT_MODE for this probe, with an exact count(*) every COUNT_EXACT_EVERY reads"""
+    if cfg.count_exact_every > 0 and state.read_count % cfg.count_exact_every == 0:
+        return "exact"
+    return cfg.count_mode
+
+
+def record_read_ok(state: DemoState, c: int, last, t0: float, mode: str = "exact", seen_at: Optional[float] = None):
+    """`seen_at`: time.monotonic() just before the last-row query, to measure staleness against the acks"""
+    state.reads.add()
+    state.last_latency_ms = (time.perf_counter() - t0) * 1000.0
+    state.latency["read"].record(state.last_latency_ms)
+
+    last_id = last["id"] if last else 0
+    last_fp = last["writer_fingerprint"] if last else "n/a"
+
+    ids_behind = ms_behind = 0
+    if seen_at is not None:
+        ids_behind, ms_behind = state.acks.staleness(last_id, seen_at)
+        state.latency["staleness"].record(ms_behind)
+        state.stale_ids.record(ids_behind)
+        if ids_behind:
+            state.stale.add()
 
-    if not result["ok"]:
-        # Raise the captured error to trigger retry/backoff handling
-        raise result["err"]
+    state.events.emit(
+        "HEALTH", HEALTH_STALE if ids_behind else HEALTH, "info", Fore.CYAN,
+        writes=state.write_count, reads=state.read_count, approx="" if mode == "exact" else "~", count=c,
+        last_id=last_id, last_fp=last_fp, latency_ms=state.last_latency_ms, stale_ids=ids_behind, stale_ms=ms_behind,
+    )
 
-    return result["inserted_id"]
+
+def _write_on_session(cfg: Config, conn, state: DemoState, pool: WritePool, payloads: PayloadFactory,
+                      deadline_s: float):
+    # The fingerprint is cached per session (refreshed every FP_CHECK_INTERVAL_S);
+    # with FP_INLINE the INSERT computes and returns it, so no extra round trip at all
+    inline = cfg.fp_inline and cfg.write_mode != "copy"
+    fp = None
+    if cfg.write_mode == "row":
+        batch = [payloads.one(next_seq(state, 1))]
+    else:
+        batch = payloads.many(next_seq(state, cfg.batch_size), cfg.batch_size)
+
+    # Errors propagate to the retry/backoff handling (a missed deadline as a TimeoutError)
+    # The deadline covers the fingerprint query too: it is the first round trip to a dead writer
+    with guard(conn, deadline_s, "WRITE"):
+        if inline:
+            current_fp = pool.cached_fingerprint(conn)
+        else:
+            current_fp = pool.fingerprint(conn, lambda c: timed(state, "fingerprint", server_fingerprint, c))
+        if current_fp:
+            state.last_fp = current_fp
+
+        if cfg.write_mode == "row":
+            if inline:
+                ids, fp = timed(state, "insert", insert_row_fp, conn, batch[0])
+            else:
+                ids = [timed(state, "insert", insert_row, conn, batch[0], current_fp)]
+        elif inline:
+            ids, fp = timed(state, "insert", insert_rows_fp, conn, batch, payload_type(cfg))
+        elif cfg.write_mode == "copy":
+            ids = timed(state, "insert", copy_rows, conn, batch, current_fp)
+        else:
+            ids = timed(state, "insert", insert_rows, conn, batch, current_fp, payload_type(cfg))
+
+    if fp:
+        # Inline fingerprint: the row records the true writer, the pool checks for a change
+        state.last_fp = fp
+        pool.remember(conn, fp)
+
+    return ids, batch
 
 
 def run_write_loop(cfg: Config, state: DemoState):
-    """Write loop with failover detection and recovery timing (with watchdog)"""
-    attempt = 0
-    backoff = cfg.retry_backoff
+    """Write loop with failover detection and recovery timing (with watchdog and pooled sessions)"""
     interval = 1.0 / cfg.write_qps if cfg.write_qps > 0 else 0.2
+    if cfg.write_mode != "row":
+        # Batches are paced by the flush interval, WRITE_QPS only applies row by row
+        interval = cfg.batch_flush_s
+    sched = make_scheduler(cfg, state, "write", 1.0 / interval if interval > 0 else 0.0)
+    if sched is not None:
+        interval = 0  # the scheduler paces the loop
+
+    pool = WritePool(cfg, on_connect=state.latency["connect"].record, resolver=state.resolver)
+    try:
+        _write_loop(cfg, state, pool, PayloadFactory.from_config(cfg), interval, cfg.write_deadline_s, sched)
+    finally:
+        pool.close()
 
-    # Permet de définir un délai via config si tu l’ajoutes plus tard
-    write_deadline_s = float(getattr(cfg, "write_deadline_s", 2.0))
+
+def _write_loop(cfg: Config, state: DemoState, pool: WritePool, payloads: PayloadFactory, interval: float,
+                write_deadline_s: float, sched: Optional[OpenLoopScheduler]):
+    attempt = 0
+    backoff = cfg.retry_backoff
 
     while not state.stop.is_set():
         try:
-            t0 = time.perf_counter()
-
-            # --- INSERT avec watchdog (délais côté client)
-            inserted_id = _write_once_with_deadline(cfg, state, deadline_s=write_deadline_s)
-            state.last_id = inserted_id
-            state.write_count += 1
-            state.last_latency_ms = (time.perf_counter() - t0) * 1000.0
-
-            # Recovery detection
-            if state.fail_started_at is not None:
-                dt = time.perf_counter() - state.fail_started_at
-                state.total_downtime_s += dt
-                print(f"{Fore.GREEN}[RECOVERY]{Style.RESET_ALL} WRITE RESUMED ✅ after {dt:.2f}s")
-                state.fail_started_at = None
+            if sched is not None:
+                # Open loop: latency is measured from the slot's intended start
+                t0 = sched.wait(state.stop)
+                if t0 is None:
+                    break
+            else:
+                t0 = time.perf_counter()
+
+            # --- INSERT sous deadline (délais côté client)
+            inserted_ids, written = _write_once_with_deadline(cfg, state, pool, payloads, deadline_s=write_deadline_s)
+            if record_write_ok(state, inserted_ids, t0, written):
                 attempt = 0  # Reset attempt counter on recovery
                 backoff = cfg.retry_backoff  # Reset backoff
 
@@ -114,56 +229,70 @@ def run_write_loop(cfg: Config, state: DemoState):
 
         except Exception as e:
             # Failover detection (ou watchdog TimeoutError)
-            if state.fail_started_at is None:
-                state.fail_started_at = time.perf_counter()
-                state.last_id_before_error = state.last_id
-                print(f"{Fore.RED}[WRITE]{Style.RESET_ALL} FAILOVER DETECTED ⚠️ {e}")
-            else:
-                print(f"{Fore.YELLOW}[WRITE]{Style.RESET_ALL} STILL DOWN ⚠️ {e}")
+            record_write_error(state, e)
 
             attempt += 1
             if cfg.retry_max and attempt > cfg.retry_max:
-                print(f"{Fore.RED}[WRITE] Max retries reached, stopping.{Style.RESET_ALL}")
+                state.events.emit("WRITE", "Max retries reached, stopping.", "error", Fore.RED)
                 state.stop.set()
                 return
 
-            print(f"{Fore.YELLOW}[WRITE]{Style.RESET_ALL} RECONNECTING ⏳ backoff={backoff:.1f}s (attempt {attempt})")
+            if cfg.failover_probe and probe_and_adopt(cfg, state, pool):
+                continue  # resume the load right away, no backoff
+
+            state.events.emit("WRITE", "RECONNECTING ⏳ backoff={backoff_s:.1f}s (attempt {attempt})", "warn",
+                              Fore.YELLOW, backoff_s=backoff, attempt=attempt)
             time.sleep(backoff)
             backoff = min(cfg.backoff_cap, backoff * 2 if backoff > 0 else cfg.retry_backoff)
 
 
+def probe_and_adopt(cfg: Config, state: DemoState, pool: Optional[WritePool] = None) -> bool:
+    """Run the parallel writer probes; the winning session is handed to the pool"""
+    state.events.emit("WRITE", "PROBING 🔎 {probes} probes for a read-write session", "warn", Fore.YELLOW,
+                      probes=cfg.probe_parallelism)
+    conn = probe_writer(cfg, state.stop)
+    if conn is None:
+        return False
+    state.timeline.mark("probe_writable", conn.info.hostaddr or conn.info.host)
+    if pool is not None:
+        pool.adopt(conn)
+    else:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return True
+
+
 def run_read_loop(cfg: Config, state: DemoState):
     """Read loop for health monitoring"""
     attempt = 0
     backoff = cfg.retry_backoff
     interval = 1.0 / cfg.read_qps if cfg.read_qps > 0 else 0.5
+    sched = make_scheduler(cfg, state, "read", 1.0 / interval if interval > 0 else 0.0)
+    if sched is not None:
+        interval = 0
 
     while not state.stop.is_set():
         try:
             # Reconnect for each operation to detect failures quickly
-            t0 = time.perf_counter()
-            with connect(cfg, role="read") as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT count(*) AS c FROM demo_events;")
-                    c = int(cur.fetchone()["c"])
-                    cur.execute("SELECT id, writer_fingerprint, ts_insert FROM demo_events ORDER BY id DESC LIMIT 1;")
-                    last = cur.fetchone()
-                    state.read_count += 1
-                    state.last_latency_ms = (time.perf_counter() - t0) * 1000.0
-
-                    last_id = last["id"] if last else 0
-                    last_fp = last["writer_fingerprint"] if last else "n/a"
-
-                    print(
-                        f"{Fore.CYAN}[HEALTH]{Style.RESET_ALL} "
-                        f"writes={state.write_count} reads={state.read_count} "
-                        f"count={c} last_id={last_id} last_fp={last_fp[:20]}... "
-                        f"latency_ms={state.last_latency_ms:.1f}"
-                    )
-
-                    # Reset attempt counter on success
-                    attempt = 0
-                    backoff = cfg.retry_backoff
+            if sched is not None:
+                t0 = sched.wait(state.stop)
+                if t0 is None:
+                    break
+            else:
+                t0 = time.perf_counter()
+            with timed(state, "connect", connect, cfg, role="read", **read_overrides(cfg, state.resolver)) as conn:
+                mode = health_count_mode(cfg, state)
+                seen_at = time.monotonic()
+                with guard(conn, cfg.read_deadline_s, "READ"):
+                    last = timed(state, "last_row", read_last_row, conn)
+                    c = timed(state, "count", read_count, conn, mode, last)
+                record_read_ok(state, c, last, t0, mode, seen_at)
+
+                # Reset attempt counter on success
+                attempt = 0
+                backoff = cfg.retry_backoff
 
             # Rate limiting (interruptible)
             if interval > 0:
@@ -176,12 +305,15 @@ def run_read_loop(cfg: Config, state: DemoState):
 
         except Exception as e:
             attempt += 1
-            print(f"{Fore.YELLOW}[READ]{Style.RESET_ALL} PAUSED ⚠️ {e}")
+            if state.resolver:
+                state.resolver.expire()
+            record_read_error(state, e)
             if cfg.retry_max and attempt > cfg.retry_max:
-                print(f"{Fore.RED}[READ] Max retries reached, stopping.{Style.RESET_ALL}")
+                state.events.emit("READ", "Max retries reached, stopping.", "error", Fore.RED)
                 state.stop.set()
                 return
 
-            print(f"{Fore.YELLOW}[READ]{Style.RESET_ALL} RECONNECTING ⏳ backoff={backoff:.1f}s (attempt {attempt})")
+            state.events.emit("READ", "RECONNECTING ⏳ backoff={backoff_s:.1f}s (attempt {attempt})", "warn",
+                              Fore.YELLOW, backoff_s=backoff, attempt=attempt)
             time.sleep(backoff)
             backoff = min(cfg.backoff_cap, backoff * 2 if backoff > 0 else cfg.retry_backoff)
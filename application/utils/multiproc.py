@@ -0,0 +1,119 @@
+import os
+import queue
+import threading
+import multiprocessing as mp
+from dataclasses import replace
+from colorama import Fore, Style
+
+from .config import Config
+from .profiles import scaled
+from .state import DemoState
+from .recorder import MetricsRecorder
+from .ledger import AckLedger
+from .events import EventSink
+from .resolver import start_resolver
+from .prometheus import start_metrics_server
+from .aws import start_cloudwatch_publisher
+
+
+def _engine_threads(cfg: Config, state: DemoState):
+    # Imported here so the coordinator does not need the engines loaded
+    if cfg.engine == "asyncio":
+        from .aio import run_async_engine
+        return [threading.Thread(target=run_async_engine, args=(cfg, state), daemon=True)]
+    from .loops import run_write_loop, run_read_loop
+    return [
+        threading.Thread(target=run_write_loop, args=(cfg, state), daemon=True),
+        threading.Thread(target=run_read_loop, args=(cfg, state), daemon=True),
+    ]
+
+
+def _worker(cfg: Config, index: int, stop, results):
+    """Worker process: runs the usual loops with its own connections and reports a snapshot"""
+    state = DemoState()
+    state.acked = AckLedger.from_config(cfg, f"-w{index}")
+    state.events = EventSink.from_config(cfg, f"-w{index}")
+    state.events.start()
+    resolver = start_resolver(cfg, state)
+    workers = _engine_threads(cfg, state)
+    metrics_server = start_metrics_server(cfg, state, offset=index)
+    # Statistic sets and counts from several workers add up in CloudWatch
+    cloudwatch = start_cloudwatch_publisher(cfg, state, f"-w{index}")
+    recorder = None
+    if cfg.metrics_csv:
+        recorder = MetricsRecorder(state, cfg.metrics_capacity, cfg.metrics_interval_s)
+        recorder.start()
+    for t in workers:
+        t.start()
+    try:
+        while not stop.is_set() and not state.stop.is_set():
+            stop.wait(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.stop.set()
+        for t in workers:
+            t.join(timeout=5)
+        if resolver:
+            resolver.stop()
+        if metrics_server:
+            metrics_server.stop()
+        if cloudwatch:
+            cloudwatch.stop()
+        if recorder:
+            recorder.stop()
+            stem, ext = os.path.splitext(cfg.metrics_csv)
+            recorder.write_csv(f"{stem}-w{index}{ext or '.csv'}")
+        snapshot = state.snapshot()
+        snapshot["worker"] = index
+        state.acked.close()
+        state.events.stop()
+        results.put(snapshot)
+
+
+def run_process_workers(cfg: Config, state: DemoState):
+    """
+    Coordinator: spawns PROCESSES workers, each with 1/K of WRITE_QPS and READ_QPS
+    (or of the load profiles),
+    waits for the mission to stop, then merges their snapshots into `state`.
+    """
+    k = max(1, cfg.processes)
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    results = ctx.Queue()
+    worker_cfg = replace(cfg, write_qps=cfg.write_qps / k, read_qps=cfg.read_qps / k,
+                         write_profile=scaled(cfg.write_profile, 1.0 / k),
+                         read_profile=scaled(cfg.read_profile, 1.0 / k))
+
+    procs = [
+        ctx.Process(target=_worker, args=(worker_cfg, i, stop, results), name=f"db007-worker-{i}", daemon=True)
+        for i in range(k)
+    ]
+    for p in procs:
+        p.start()
+    print(f"{Fore.GREEN}[MISSION]{Style.RESET_ALL} {k} worker processes started")
+
+    while not state.stop.is_set() and any(p.is_alive() for p in procs):
+        state.stop.wait(0.2)
+    stop.set()
+
+    # Drain before joining: a child blocks on exit until its queued snapshot is read
+    snapshots = []
+    while len(snapshots) < k:
+        try:
+            snapshots.append(results.get(timeout=10))
+        except queue.Empty:
+            print(f"{Fore.RED}[MISSION]{Style.RESET_ALL} {k - len(snapshots)} worker(s) did not report")
+            break
+    for p in procs:
+        p.join(timeout=5)
+
+    state.absorb(snapshots)
+
+
+def engine_threads(cfg: Config, state: DemoState):
+    """Traffic threads (not started) for ENGINE / PROCESSES"""
+    if cfg.processes > 1:
+        # The coordinator merges the workers' counters and downtime windows into state
+        return [threading.Thread(target=run_process_workers, args=(cfg, state), daemon=True)]
+    return _engine_threads(cfg, state)
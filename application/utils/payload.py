@@ -0,0 +1,46 @@
+import random
+import string
+import time
+from typing import List, Optional
+
+PAD_ALPHABET = string.ascii_letters + string.digits  # JSON-safe, barely compressible
+_HEAD = '{"seq":%d,"at":%.6f,"pad":"'
+_TAIL = '"}'
+
+
+class PayloadFactory:
+    """
+    Builds demo_events payloads of PAYLOAD_BYTES (up to PAYLOAD_BYTES_MAX) bytes.
+
+    The random pad is generated once and sliced for every row, so a row costs a
+    string format and a slice instead of json.dumps + uuid4 + isoformat. Payloads
+    are valid JSON (they fit the JSONB variant) and ASCII, so characters = bytes.
+    Not thread-safe: use one factory per writer thread / event loop.
+    """
+
+    def __init__(self, min_bytes: int = 0, max_bytes: int = 0, rng: Optional[random.Random] = None):
+        self.min_bytes = max(0, min_bytes)
+        self.max_bytes = max(self.min_bytes, max_bytes)
+        self._rng = rng or random.Random()
+        self._pad = "".join(self._rng.choices(PAD_ALPHABET, k=self.max_bytes))
+
+    @classmethod
+    def from_config(cls, cfg) -> "PayloadFactory":
+        return cls(cfg.payload_bytes, cfg.payload_bytes_max)
+
+    def _size(self) -> int:
+        if self.max_bytes == self.min_bytes:
+            return self.min_bytes
+        return self._rng.randint(self.min_bytes, self.max_bytes)
+
+    def _build(self, seq: int, at: float) -> str:
+        head = _HEAD % (seq, at)
+        pad = self._size() - len(head) - len(_TAIL)
+        return head + self._pad[:pad] + _TAIL if pad > 0 else head + _TAIL
+
+    def one(self, seq: int) -> str:
+        return self._build(seq, time.time())
+
+    def many(self, first_seq: int, count: int) -> List[str]:
+        at = time.time()  # one timestamp per batch
+        return [self._build(first_seq + i, at) for i in range(count)]
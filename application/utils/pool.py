@@ -0,0 +1,162 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from psycopg.pq import TransactionStatus
+
+from .config import Config
+from .database import connect
+from .resolver import EndpointResolver, connect_overrides
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class WritePool:
+    """
+    Cached write session for the write loop.
+
+    The connection stays open between INSERTs instead of paying a TLS handshake per
+    write. The write loop borrows one session at a time, so one idle session is kept;
+    sessions opened meanwhile (e.g. by an adopted failover probe) are closed on release.
+    Any error on a borrowed session invalidates the pool: after a failover the idle
+    socket still points to the old writer, so it is dropped and the next acquire
+    reconnects through the cluster endpoint.
+    """
+
+    def __init__(self, cfg: Config, on_connect: Optional[Callable[[float], None]] = None,
+                 resolver: Optional[EndpointResolver] = None):
+        self.cfg = cfg
+        self.on_connect = on_connect  # receives the connect latency in ms
+        self.resolver = resolver
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._fp: Optional[str] = None
+        # Per-session fingerprint cache: id(conn) -> (fingerprint, monotonic time checked)
+        self._session_fps: Dict[int, Tuple[str, float]] = {}
+
+    def _open(self):
+        t0 = time.perf_counter()
+        conn = connect(self.cfg, role="write", **connect_overrides(self.resolver))
+        if self.on_connect:
+            self.on_connect((time.perf_counter() - t0) * 1000.0)
+        conn.autocommit = True
+        return conn
+
+    @staticmethod
+    def _usable(conn) -> bool:
+        """Cheap client-side validation (no round trip)"""
+        if conn.closed or conn.broken:
+            return False
+        return conn.info.transaction_status == TransactionStatus.IDLE
+
+    def _acquire(self):
+        with self._lock:
+            gen = self._generation
+            while self._idle:
+                conn = self._idle.pop()
+                if self._usable(conn):
+                    return conn, gen
+                self._forget(conn)
+                _close_quietly(conn)
+        return self._open(), gen
+
+    def _release(self, conn, gen: int):
+        with self._lock:
+            if gen == self._generation and not self._idle and self._usable(conn):
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _forget(self, conn):
+        self._session_fps.pop(id(conn), None)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._forget(conn)
+        _close_quietly(conn)
+
+    @contextmanager
+    def session(self):
+        """Borrow a write session; any exception evicts it and invalidates the pool"""
+        conn, gen = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._discard(conn)
+            self.invalidate()
+            raise
+        self._release(conn, gen)
+
+    def adopt(self, conn):
+        """Add an already opened write session (e.g. the winning failover probe)"""
+        conn.autocommit = True
+        self._release(conn, self._generation)
+
+    def cached_fingerprint(self, conn) -> Optional[str]:
+        entry = self._session_fps.get(id(conn))
+        return entry[0] if entry else None
+
+    def fingerprint(self, conn, fetch: Callable) -> str:
+        """
+        Writer fingerprint of a session, cached for the session's lifetime.
+        `fetch(conn)` runs on a new session and every FP_CHECK_INTERVAL_S (0 = every call).
+        """
+        entry = self._session_fps.get(id(conn))
+        max_age = self.cfg.fp_check_interval_s
+        if entry and max_age > 0 and time.monotonic() - entry[1] < max_age:
+            return entry[0]
+        fp = fetch(conn)
+        self.remember(conn, fp)
+        return fp
+
+    def remember(self, conn, fp: str):
+        """Cache a fingerprint observed on a session (e.g. returned by an inline INSERT)"""
+        with self._lock:
+            self._session_fps[id(conn)] = (fp, time.monotonic())
+        self.observe_fingerprint(fp)
+
+    def observe_fingerprint(self, fp: str) -> bool:
+        """
+        Record the writer fingerprint seen on a session.
+        Returns True when the writer changed; idle sessions not known to be on the
+        new writer are dropped (the observing session is kept).
+        """
+        with self._lock:
+            changed = self._fp is not None and fp != self._fp
+            self._fp = fp
+            stale = []
+            if changed:
+                keep = deque()
+                for conn in self._idle:
+                    (keep if self.cached_fingerprint(conn) == fp else stale).append(conn)
+                self._idle = keep
+                for conn in stale:
+                    self._forget(conn)
+        for conn in stale:
+            _close_quietly(conn)
+        return changed
+
+    def invalidate(self):
+        """Drop every idle session; sessions in flight are closed on release"""
+        if self.resolver:
+            # The endpoint may have moved: resolve again before reconnecting
+            self.resolver.expire()
+        with self._lock:
+            self._generation += 1
+            stale = list(self._idle)
+            self._idle.clear()
+            for conn in stale:
+                self._forget(conn)
+        for conn in stale:
+            _close_quietly(conn)
+
+    def close(self):
+        self.invalidate()
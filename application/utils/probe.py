@@ -0,0 +1,78 @@
+import socket
+import threading
+import time
+from typing import Optional
+
+from .config import Config
+from .database import connect, is_writable
+
+
+def resolve(host: str, port: int) -> Optional[str]:
+    """Fresh resolution of the endpoint (first IPv4/IPv6 address), None on failure"""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return None
+    return infos[0][4][0] if infos else None
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def probe_writer(cfg: Config, stop: threading.Event):
+    """
+    Look for the new writer with PROBE_PARALLELISM concurrent, staggered probes.
+
+    Each probe re-resolves the endpoint (the CNAME flips during a Multi-AZ failover),
+    connects with a short connect_timeout directly to the resolved address and keeps
+    the session only if it is read-write. Returns the first writable connection
+    (autocommit on), or None when `stop` is set or PROBE_MAX_WAIT_S elapsed.
+    """
+    found = threading.Event()
+    result = {"conn": None, "returned": False}
+    lock = threading.Lock()
+    give_up_at = time.monotonic() + cfg.probe_max_wait_s
+    parallelism = max(1, cfg.probe_parallelism)
+    stagger = cfg.probe_interval_s / parallelism
+
+    def _done() -> bool:
+        return found.is_set() or stop.is_set() or time.monotonic() >= give_up_at
+
+    def _probe(index: int):
+        if found.wait(index * stagger):
+            return
+        while not _done():
+            overrides = {"connect_timeout": cfg.probe_connect_timeout}
+            addr = resolve(cfg.db_host, cfg.db_port)
+            if addr:
+                overrides["hostaddr"] = addr
+            conn = None
+            try:
+                conn = connect(cfg, role="write", **overrides)
+                conn.autocommit = True
+                if is_writable(conn):
+                    with lock:
+                        # After the caller returned, a late winner has nobody to hand its session to
+                        if result["conn"] is None and not result["returned"]:
+                            result["conn"] = conn
+                            found.set()
+                            return
+                _close_quietly(conn)
+            except Exception:
+                if conn is not None:
+                    _close_quietly(conn)
+            found.wait(cfg.probe_interval_s)
+
+    probes = [threading.Thread(target=_probe, args=(i,), daemon=True) for i in range(parallelism)]
+    for t in probes:
+        t.start()
+    while not _done():
+        found.wait(0.1)
+    # Probes return within one connect_timeout; losers and late winners close their connection
+    with lock:
+        result["returned"] = True
+        return result["conn"]
@@ -0,0 +1,150 @@
+import json
+import math
+from typing import List, Optional, Tuple
+
+
+def _rate(name: str, value) -> float:
+    """A finite, non-negative rate"""
+    value = float(value)
+    if not (math.isfinite(value) and value >= 0):
+        raise ValueError(f"{name} must be a rate >= 0, got {value:g}")
+    return value
+
+
+def _period(name: str, value) -> float:
+    """A finite, positive duration in seconds"""
+    value = float(value)
+    if not (math.isfinite(value) and value > 0):
+        raise ValueError(f"{name} must be > 0 seconds, got {value:g}")
+    return value
+
+
+class LoadProfile:
+    """Target rate (operations/s) as a function of the seconds elapsed since traffic started"""
+
+    def rate_at(self, t: float) -> float:
+        raise NotImplementedError
+
+
+class StepProfile(LoadProfile):
+    """Piecewise constant: [(from_s, rate), ...]"""
+
+    def __init__(self, steps: List[Tuple[float, float]]):
+        if not steps:
+            raise ValueError("step profile needs at least one step")
+        self.steps = sorted((float(t), _rate(f"step rate at {float(t):g}s", r)) for t, r in steps)
+
+    def rate_at(self, t: float) -> float:
+        rate = 0.0
+        for start, r in self.steps:
+            if t < start:
+                break
+            rate = r
+        return rate
+
+    def __repr__(self):
+        return "step(" + ", ".join(f"{t:g}s={r:g}" for t, r in self.steps) + ")"
+
+
+class RampProfile(LoadProfile):
+    """Linear from `start` to `end` over `duration_s`, then holds `end`"""
+
+    def __init__(self, start: float, end: float, duration_s: float):
+        self.start, self.end = _rate("from", start), _rate("to", end)
+        self.duration_s = _period("duration_s", duration_s)
+
+    def rate_at(self, t: float) -> float:
+        if t >= self.duration_s:
+            return self.end
+        return self.start + (self.end - self.start) * max(0.0, t) / self.duration_s
+
+    def __repr__(self):
+        return f"ramp({self.start:g}->{self.end:g} over {self.duration_s:g}s)"
+
+
+class SineProfile(LoadProfile):
+    """base + amplitude * sin(2*pi*t/period_s), never below 0"""
+
+    def __init__(self, base: float, amplitude: float, period_s: float):
+        self.base, self.amplitude = _rate("base", base), float(amplitude)
+        self.period_s = _period("period_s", period_s)
+
+    def rate_at(self, t: float) -> float:
+        return max(0.0, self.base + self.amplitude * math.sin(2 * math.pi * t / self.period_s))
+
+    def __repr__(self):
+        return f"sine({self.base:g}±{self.amplitude:g}, period {self.period_s:g}s)"
+
+
+class BurstProfile(LoadProfile):
+    """`base` rate with `peak` bursts lasting `duration_s` every `every_s` (first burst after `every_s`)"""
+
+    def __init__(self, base: float, peak: float, every_s: float, duration_s: float):
+        self.base, self.peak = _rate("base", base), _rate("peak", peak)
+        self.every_s, self.duration_s = _period("every_s", every_s), _period("duration_s", duration_s)
+
+    def rate_at(self, t: float) -> float:
+        if t < self.every_s:
+            return self.base
+        return self.peak if (t % self.every_s) < self.duration_s else self.base
+
+    def __repr__(self):
+        return f"burst({self.base:g}, {self.peak:g} for {self.duration_s:g}s every {self.every_s:g}s)"
+
+
+class ScaledProfile(LoadProfile):
+    """`profile` times `factor` (the share of one worker process)"""
+
+    def __init__(self, profile: LoadProfile, factor: float):
+        self.profile, self.factor = profile, factor
+
+    def rate_at(self, t: float) -> float:
+        return self.profile.rate_at(t) * self.factor
+
+    def __repr__(self):
+        return f"{self.profile!r} x{self.factor:g}"
+
+
+def scaled(profile: Optional[LoadProfile], factor: float) -> Optional[LoadProfile]:
+    return ScaledProfile(profile, factor) if profile is not None and factor != 1 else profile
+
+
+def _from_dict(d: dict) -> LoadProfile:
+    kind = d.get("type")
+    if kind == "step":
+        return StepProfile(d["steps"])
+    if kind == "ramp":
+        return RampProfile(d["from"], d["to"], d["duration_s"])
+    if kind == "sine":
+        return SineProfile(d["base"], d["amplitude"], d["period_s"])
+    if kind == "burst":
+        return BurstProfile(d["base"], d["peak"], d["every_s"], d["duration_s"])
+    raise ValueError(f"unknown profile type {kind!r} (step, ramp, sine, burst)")
+
+
+def _from_compact(spec: str) -> LoadProfile:
+    """
+    Compact env form:
+      step:0=5,60=50,120=100
+      ramp:from=5,to=500,duration_s=300
+      sine:base=50,amplitude=40,period_s=60
+      burst:base=10,peak=200,every_s=30,duration_s=5
+    """
+    kind, _, body = spec.partition(":")
+    pairs = [p.split("=", 1) for p in body.split(",") if p.strip()]
+    if kind == "step":
+        return StepProfile([(float(k), float(v)) for k, v in pairs])
+    d = {k.strip(): float(v) for k, v in pairs}
+    d["type"] = kind.strip()
+    return _from_dict(d)
+
+
+def parse_profile(spec: str) -> LoadProfile:
+    """Parse a profile from a compact string, inline JSON, or @path to a JSON file"""
+    spec = spec.strip()
+    if spec.startswith("@"):
+        with open(spec[1:]) as f:
+            return _from_dict(json.load(f))
+    if spec.startswith("{"):
+        return _from_dict(json.loads(spec))
+    return _from_compact(spec)
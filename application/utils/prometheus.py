@@ -0,0 +1,127 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .config import Config
+
+# Prometheus histogram buckets (ms) derived from the HDR histograms at scrape time
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(state) -> str:
+    """Prometheus text exposition of the run: counters, outage state, writer and latency histograms"""
+    now = time.monotonic()
+    started = state.fail_started_at
+    lines = []
+
+    def metric(name: str, kind: str, help_: str, samples):
+        lines.append(f"# HELP db007_{name} {help_}")
+        lines.append(f"# TYPE db007_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"db007_{name}{labels} {value}")
+
+    metric("writes_total", "counter", "Acknowledged rows", [("", state.write_count)])
+    metric("reads_total", "counter", "Health reads", [("", state.read_count)])
+    metric("write_errors_total", "counter", "Failed write attempts", [("", state.write_errors)])
+    metric("read_errors_total", "counter", "Failed health reads", [("", state.read_errors)])
+    metric("stale_reads_total", "counter", "Reads missing acknowledged writes", [("", state.stale_reads)])
+    metric("last_id", "gauge", "Newest acknowledged id", [("", state.last_id)])
+    metric("downtime_seconds_total", "counter", "Closed write outages", [("", f"{state.total_downtime_s:.6f}")])
+    metric("outages_total", "counter", "Write outages seen", [("", len(state.timeline.outages))])
+    metric("outage_open", "gauge", "1 while writes are failing", [("", int(started is not None))])
+    metric("outage_seconds", "gauge", "Age of the open outage", [("", f"{now - started:.3f}" if started else "0")])
+    metric("writer_info", "gauge", "Writer fingerprint of the last write",
+           [(f'{{fingerprint="{_label(state.last_fp or "")}"}}', 1)])
+
+    lines.append("# HELP db007_latency_seconds Client-observed latency per operation")
+    lines.append("# TYPE db007_latency_seconds histogram")
+    for op, h in state.latency.items():
+        if op == "staleness" or not h.total:
+            continue  # staleness is a lag, not an operation
+        total, sum_us = h.total, h.sum_us
+        for bound, n in zip(LATENCY_BUCKETS_MS, h.cumulative(LATENCY_BUCKETS_MS)):
+            lines.append(f'db007_latency_seconds_bucket{{op="{op}",le="{bound / 1000:g}"}} {min(n, total)}')
+        lines.append(f'db007_latency_seconds_bucket{{op="{op}",le="+Inf"}} {total}')
+        lines.append(f'db007_latency_seconds_sum{{op="{op}"}} {sum_us / 1e6:.6f}')
+        lines.append(f'db007_latency_seconds_count{{op="{op}"}} {total}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    /metrics over http.server in a daemon thread.
+
+    A scrape never touches the loops: it reads the sharded counters and copies
+    the histogram buckets. The page is rendered at most every `min_interval_s`
+    and served from cache in between, so several scrapers cost one render.
+    """
+
+    def __init__(self, state, port: int, host: str = "0.0.0.0", min_interval_s: float = 1.0):
+        self.state = state
+        self.min_interval_s = min_interval_s
+        self.scrapes = 0
+        self._cache = (0.0, b"")
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = server.body()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # one line per scrape would flood the console
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def body(self) -> bytes:
+        with self._lock:
+            at, body = self._cache
+            if time.monotonic() - at >= self.min_interval_s or not body:
+                body = render(self.state).encode()
+                self._cache = (time.monotonic(), body)
+            self.scrapes += 1
+            return body
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def start_metrics_server(cfg: Config, state, offset: int = 0) -> Optional[MetricsServer]:
+    """Serve /metrics on METRICS_PORT (+ offset: one port per worker process) when set"""
+    if cfg.metrics_port <= 0:
+        return None
+    try:
+        server = MetricsServer(state, cfg.metrics_port + offset, cfg.metrics_host, cfg.metrics_min_interval_s)
+    except OSError as e:
+        state.events.emit("METRICS", "cannot listen on port {port}: {error}", "error", port=cfg.metrics_port + offset,
+                          error=str(e))
+        return None
+    server.start()
+    return server
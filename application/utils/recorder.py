@@ -0,0 +1,123 @@
+import csv
+import time
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from .state import DemoState
+
+# Column name -> array typecode. Every column is preallocated to `capacity` samples.
+COLUMNS = {
+    "t_s": "d",              # seconds since the recorder started (monotonic)
+    "writes": "q",           # per-interval deltas
+    "reads": "q",
+    "write_errors": "q",
+    "read_errors": "q",
+    "write_p50_ms": "d",     # interval quantiles of end-to-end write/read latency
+    "write_p99_ms": "d",
+    "write_max_ms": "d",
+    "read_p50_ms": "d",
+    "read_p99_ms": "d",
+    "fp": "i",               # index into the fingerprint table
+}
+
+
+class MetricsRecorder:
+    """
+    Per-interval time series of the run in a fixed-size ring buffer.
+
+    Samples are written into preallocated typed arrays (one per column), so an
+    hours-long run costs the same memory as a short one: once `capacity` samples
+    are stored the oldest ones are overwritten. Fingerprints are interned.
+    """
+
+    def __init__(self, state: DemoState, capacity: int = 86400, interval_s: float = 1.0):
+        self.state = state
+        self.capacity = max(1, capacity)
+        self.interval_s = interval_s
+        self.cols: Dict[str, array] = {
+            name: array(code, bytes(array(code).itemsize * self.capacity)) for name, code in COLUMNS.items()
+        }
+        self.fingerprints: List[str] = []
+        self._fp_index: Dict[str, int] = {}
+        self.n = 0  # samples taken (may exceed capacity)
+
+        self._t_start = time.monotonic()
+        self._prev = self._counters()
+        self._prev_write = array("q", state.latency["write"].counts)
+        self._prev_read = array("q", state.latency["read"].counts)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _counters(self):
+        s = self.state
+        return s.write_count, s.read_count, s.write_errors, s.read_errors
+
+    def _fp_id(self, fp: Optional[str]) -> int:
+        fp = fp or ""
+        i = self._fp_index.get(fp)
+        if i is None:
+            i = self._fp_index[fp] = len(self.fingerprints)
+            self.fingerprints.append(fp)
+        return i
+
+    def sample(self):
+        """Take one sample (called every interval by the background thread)"""
+        now = time.monotonic()
+        counters = self._counters()
+        # One copy per histogram: diffed against the previous one, then kept as the next baseline
+        write_counts = array("q", self.state.latency["write"].counts)
+        read_counts = array("q", self.state.latency["read"].counts)
+        w = self.state.latency["write"].since(self._prev_write, write_counts)
+        r = self.state.latency["read"].since(self._prev_read, read_counts)
+        self._prev_write, self._prev_read = write_counts, read_counts
+
+        slot = self.n % self.capacity
+        c = self.cols
+        c["t_s"][slot] = now - self._t_start
+        c["writes"][slot] = counters[0] - self._prev[0]
+        c["reads"][slot] = counters[1] - self._prev[1]
+        c["write_errors"][slot] = counters[2] - self._prev[2]
+        c["read_errors"][slot] = counters[3] - self._prev[3]
+        c["write_p50_ms"][slot] = w.percentile(50)
+        c["write_p99_ms"][slot] = w.percentile(99)
+        c["write_max_ms"][slot] = w.max_us / 1000.0
+        c["read_p50_ms"][slot] = r.percentile(50)
+        c["read_p99_ms"][slot] = r.percentile(99)
+        c["fp"][slot] = self._fp_id(self.state.last_fp)
+        self._prev = counters
+        self.n += 1
+
+    def _run(self):
+        next_at = time.monotonic() + self.interval_s
+        while not self._stop.wait(max(0.0, next_at - time.monotonic())):
+            self.sample()
+            next_at += self.interval_s
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.sample()  # partial last interval
+
+    def _slots(self):
+        """Ring slots in chronological order"""
+        if self.n <= self.capacity:
+            return range(self.n)
+        start = self.n % self.capacity
+        return [(start + i) % self.capacity for i in range(self.capacity)]
+
+    def write_csv(self, path: str):
+        names = list(COLUMNS)
+        fp_col = names.index("fp")
+        with open(path, "w", newline="") as f:
+            out = csv.writer(f)
+            out.writerow(names)
+            for slot in self._slots():
+                row = [self.cols[name][slot] for name in names]
+                row[fp_col] = self.fingerprints[row[fp_col]]
+                out.writerow(row)
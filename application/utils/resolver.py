@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from colorama import Fore
+
+from .config import Config
+from .probe import resolve
+
+
+class EndpointResolver:
+    """
+    Cached resolution of the RDS endpoint.
+
+    The address is re-resolved in a background thread every `ttl_s`, so connections
+    use `hostaddr=<cached ip>` and skip the per-connection DNS lookup. When the
+    endpoint's address changes (the CNAME flip of a Multi-AZ failover) the change
+    is timestamped and `on_change(at, old, new)` is called.
+    """
+
+    def __init__(self, host: str, port: int, ttl_s: float = 1.0,
+                 resolve_fn: Callable[[str, int], Optional[str]] = resolve,
+                 on_change: Optional[Callable[[float, Optional[str], str], None]] = None):
+        self.host = host
+        self.port = port
+        self.ttl_s = ttl_s
+        self.resolve_fn = resolve_fn
+        self.on_change = on_change
+        self.changes: List[Tuple[float, Optional[str], str]] = []  # (monotonic, old, new)
+        self._addr: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Optional[str]:
+        """Resolve now; keeps the previous address if resolution fails"""
+        addr = self.resolve_fn(self.host, self.port)
+        now = time.monotonic()
+        changed = None
+        with self._lock:
+            if addr is None:
+                return self._addr
+            if addr != self._addr:
+                if self._addr is not None:
+                    changed = (now, self._addr, addr)
+                    self.changes.append(changed)
+                self._addr = addr
+            self._expires_at = now + self.ttl_s
+        if changed and self.on_change:
+            self.on_change(*changed)
+        return addr
+
+    def address(self) -> Optional[str]:
+        """Cached address; resolves inline only when the cache has expired"""
+        with self._lock:
+            if self._addr is not None and time.monotonic() < self._expires_at:
+                return self._addr
+        return self.refresh()
+
+    def expire(self):
+        """Force the next address() to resolve again (e.g. after a connection error)"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def overrides(self) -> dict:
+        """libpq parameters for connect(): host stays for TLS, hostaddr skips the lookup"""
+        addr = self.address()
+        return {"hostaddr": addr} if addr else {}
+
+    def _run(self):
+        while not self._stop.wait(self.ttl_s):
+            self.refresh()
+
+    def start(self):
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="dns-resolver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+
+def connect_overrides(resolver: Optional[EndpointResolver]) -> dict:
+    return resolver.overrides() if resolver else {}
+
+
+def read_overrides(cfg: Config, resolver: Optional[EndpointResolver]) -> dict:
+    """The resolver caches DB_HOST: it does not apply to a separate DB_READER_HOST"""
+    return {} if cfg.db_reader_host else connect_overrides(resolver)
+
+
+def start_resolver(cfg: Config, state) -> Optional[EndpointResolver]:
+    """Create and start the writer endpoint resolver when DNS_CACHE is on"""
+    if not cfg.dns_cache:
+        return None
+
+    def _flip(at: float, old: Optional[str], new: str):
+        state.timeline.mark("dns_flip", f"{old} -> {new}", at=at)
+        state.events.emit("DNS", "{host} now resolves to {new} (was {old})", "warn", Fore.MAGENTA,
+                          host=cfg.db_host, new=new, old=old)
+
+    resolver = EndpointResolver(cfg.db_host, cfg.db_port, cfg.dns_ttl_s, on_change=_flip)
+    resolver.start()
+    state.resolver = resolver
+    return resolver
@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+PAUSE_STEP_S = 0.1     # resolution used to find the end of a zero-rate phase
+PAUSE_LOOKAHEAD = 600  # steps (60 s) looked ahead per slot
+
+
+@dataclass
+class SlotStats:
+    """Open-loop slot accounting for one operation type"""
+    issued: int = 0      # operations started
+    late: int = 0        # started more than LATE_THRESHOLD_MS after their slot
+    missed: int = 0      # slots dropped because the loop fell more than MAX_LAG_S behind
+    max_lag_ms: float = 0.0
+
+
+class OpenLoopScheduler:
+    """
+    Fixed-timeline (open-loop) pacing.
+
+    Slots are laid out from the start time at the target rate (uniform or Poisson
+    arrivals) regardless of how long each operation takes, so a slow operation
+    does not push the following ones back. Callers measure latency from the
+    slot's intended start, which exposes coordinated omission instead of hiding it.
+    When the loop falls more than `max_lag_s` behind (an outage, a long backoff),
+    the overdue slots are counted as missed and the timeline restarts from now.
+
+    `rate_at(elapsed_s)` gives the target operations/s (it follows WRITE_PROFILE /
+    READ_PROFILE); while it is <= 0 the load is paused and no slot is handed out.
+    """
+
+    def __init__(self, rate_at: Callable[[float], float], stats: SlotStats, *, poisson: bool = False,
+                 max_lag_s: float = 1.0, late_threshold_ms: float = 10.0,
+                 rng: Optional[random.Random] = None):
+        self.rate_at = rate_at
+        self.stats = stats
+        self.poisson = poisson
+        self.max_lag_s = max_lag_s
+        self.late_threshold_s = late_threshold_ms / 1000.0
+        self.rng = rng or random.Random()
+        self.started_at = time.perf_counter()
+        self._next = self.started_at
+
+    def _interval(self, rate: float) -> float:
+        return self.rng.expovariate(rate) if self.poisson else 1.0 / rate
+
+    def _resume(self, slot: float) -> float:
+        """First time at or after `slot` where the target rate is positive again (bounded look-ahead)"""
+        for _ in range(PAUSE_LOOKAHEAD):
+            if self.rate_at(slot - self.started_at) > 0:
+                break
+            slot += PAUSE_STEP_S
+        return slot
+
+    def next_slot(self) -> float:
+        """Intended start (perf_counter) of the next operation; the caller waits until then"""
+        slot = self._next
+        now = time.perf_counter()
+        behind = now - slot
+        if behind > self.max_lag_s:
+            # Fell behind: drop the overdue slots instead of bursting to catch up
+            rate = self.rate_at(now - self.started_at)
+            self.stats.missed += int(behind * max(0.0, rate))
+            slot = now
+        slot = self._resume(slot)
+        rate = self.rate_at(slot - self.started_at)
+        # rate can still be <= 0 after a long pause: one slot per look-ahead window
+        self._next = slot + (self._interval(rate) if rate > 0 else PAUSE_STEP_S * PAUSE_LOOKAHEAD)
+        return slot
+
+    def issued(self, slot: float):
+        """Record that the operation for `slot` starts now"""
+        lag = time.perf_counter() - slot
+        self.stats.issued += 1
+        if lag > self.late_threshold_s:
+            self.stats.late += 1
+        if lag * 1000.0 > self.stats.max_lag_ms:
+            self.stats.max_lag_ms = lag * 1000.0
+
+    def wait(self, stop: threading.Event) -> Optional[float]:
+        """Blocking helper for the threaded loops: returns the slot, or None once stopped"""
+        slot = self.next_slot()
+        delay = slot - time.perf_counter()
+        if delay > 0 and stop.wait(delay):
+            return None
+        if stop.is_set():
+            return None
+        self.issued(slot)
+        return slot
+
+
+def make_scheduler(cfg, state, op: str, rate: float, share: int = 1) -> Optional[OpenLoopScheduler]:
+    """
+    Open-loop scheduler for `op` ("write" | "read"), or None for closed-loop pacing.
+
+    `rate` is this loop's fixed operations/s (<= 0 = unthrottled). A load profile
+    (WRITE_PROFILE / READ_PROFILE) always runs open loop: its rate is in rows/s for
+    writes (divided by BATCH_SIZE in batch/copy modes) and split over `share` loops.
+    """
+    profile = cfg.write_profile if op == "write" else cfg.read_profile
+    if profile is None and (cfg.schedule != "open" or rate <= 0):
+        return None
+    if profile is not None:
+        per_op = share * (cfg.batch_size if op == "write" and cfg.write_mode != "row" else 1)
+        rate_at = lambda elapsed: profile.rate_at(elapsed) / per_op
+    else:
+        rate_at = lambda _elapsed: rate
+    stats = state.slots.setdefault(op, SlotStats())
+    return OpenLoopScheduler(
+        rate_at, stats, poisson=cfg.arrivals == "poisson",
+        max_lag_s=cfg.max_lag_s, late_threshold_ms=cfg.late_threshold_ms,
+    )
@@ -0,0 +1,40 @@
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+
+class AckClock:
+    """
+    When the writer acknowledged its recent ids, to date what a reader sees.
+
+    Keeps the last `capacity` acknowledgements as (highest id of the write,
+    time.monotonic()). A read that started at `at` and saw `seen_id` as the newest
+    row is stale by the ids acknowledged before `at` that it did not see, and by
+    the age of the oldest of them (read-your-writes lag, in ms).
+
+    No lock: deque.append() and deque.copy() are each atomic in CPython, so the
+    writers append freely and a read scans its own copy.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self._acks = deque(maxlen=capacity)
+
+    def ack(self, last_id: int, at: Optional[float] = None):
+        self._acks.append((last_id, time.monotonic() if at is None else at))
+
+    def staleness(self, seen_id: int, at: float) -> Tuple[int, float]:
+        """(ids behind, ms behind) of a read started at `at` (monotonic) that saw `seen_id`"""
+        newest = 0
+        oldest_unseen = None
+        acks = self._acks.copy()  # iterating the live deque fails when a writer appends
+        for last_id, acked_at in reversed(acks):
+            if acked_at > at:
+                continue  # acknowledged after the read started
+            if not newest:
+                newest = last_id
+            if last_id <= seen_id:
+                break
+            oldest_unseen = acked_at
+        if oldest_unseen is None:
+            return 0, 0.0
+        return max(0, newest - seen_id), (at - oldest_unseen) * 1000.0
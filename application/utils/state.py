@@ -1,30 +1,165 @@
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import itertools
 import threading
 
+from .histogram import CountHistogram, LatencyHistogram, merge_all
+from .timeline import OutageTimeline
+from .scheduler import SlotStats
+from .ledger import AckLedger
+from .staleness import AckClock
+from .events import EventSink
+from .counters import MaxCounter, ShardedCounter
+
+# Latency histograms kept per operation (write/read are end-to-end iterations)
+# "staleness": how old the oldest acknowledged write a read did not see was (read-your-writes lag)
+OPERATIONS = ("connect", "fingerprint", "insert", "write", "count", "last_row", "read", "staleness")
+
 @dataclass
 class DemoState:
     """Shared state for Mission DB007 monitoring"""
     # Control
     stop: threading.Event = field(default_factory=threading.Event)
+
+    # Console / JSON-lines event log (utils.events, drained off the hot path once started)
+    events: EventSink = field(default_factory=EventSink)
     
-    # Counters
-    write_count: int = 0
-    read_count: int = 0
-    last_id: int = 0
+    # Counters: per-thread shards, summed on read (write_count, read_count... below)
+    writes: ShardedCounter = field(default_factory=ShardedCounter)
+    reads: ShardedCounter = field(default_factory=ShardedCounter)
+    newest_id: MaxCounter = field(default_factory=MaxCounter)
+    write_fails: ShardedCounter = field(default_factory=ShardedCounter)
+    read_fails: ShardedCounter = field(default_factory=ShardedCounter)
+    # Payload sequence numbers: next() on itertools.count is atomic
+    seq: Iterator[int] = field(default_factory=itertools.count)
+
+    # Acknowledged writes: ids and payload hashes (end-of-run RPO verification)
+    acked: AckLedger = field(default_factory=AckLedger)
+    # Recent acknowledgement times, and how far behind the reads were
+    acks: AckClock = field(default_factory=AckClock)
+    stale: ShardedCounter = field(default_factory=ShardedCounter)
+    stale_ids: CountHistogram = field(default_factory=CountHistogram)  # ids behind per read
     
+    # Open-loop slot accounting per operation (SCHEDULE=open)
+    slots: Dict[str, SlotStats] = field(default_factory=dict)
+
     # Performance metrics
     last_latency_ms: float = 0.0
+    latency: Dict[str, LatencyHistogram] = field(
+        default_factory=lambda: {op: LatencyHistogram() for op in OPERATIONS}
+    )
     
     # Failover tracking
     fail_started_at: Optional[float] = None
-    total_downtime_s: float = 0.0
+    downtime: ShardedCounter = field(default_factory=lambda: ShardedCounter(0.0))
+    # Taken only on outage open / close, not on every write
+    outage_lock: threading.Lock = field(default_factory=threading.Lock)
     last_id_before_error: Optional[int] = None
+    downtime_windows: List[Tuple[float, float]] = field(default_factory=list)  # time.monotonic()
+    timeline: OutageTimeline = field(default_factory=OutageTimeline)
     
     # Server fingerprints (for failover detection)
     first_fp: Optional[str] = None
     last_fp: Optional[str] = None
     
+    # Cached endpoint resolution (utils.resolver.EndpointResolver, DNS_CACHE=true)
+    resolver: Optional[Any] = None
+
     # Availability zones
     first_az: Optional[str] = None
-    last_az: Optional[str] = None
\ No newline at end of file
+    last_az: Optional[str] = None
+
+    @property
+    def write_count(self) -> int:
+        return self.writes.value
+
+    @property
+    def read_count(self) -> int:
+        return self.reads.value
+
+    @property
+    def last_id(self) -> int:
+        return self.newest_id.value
+
+    @property
+    def write_errors(self) -> int:
+        return self.write_fails.value
+
+    @property
+    def read_errors(self) -> int:
+        return self.read_fails.value
+
+    @property
+    def stale_reads(self) -> int:
+        return self.stale.value
+
+    @property
+    def total_downtime_s(self) -> float:
+        return self.downtime.value
+
+    def snapshot(self) -> dict:
+        """Picklable summary sent by a worker process to the coordinator"""
+        windows = list(self.downtime_windows)
+        if self.fail_started_at is not None:
+            # Still down when the run stopped
+            windows.append((self.fail_started_at, None))
+        return {
+            "write_count": self.write_count,
+            "read_count": self.read_count,
+            "write_errors": self.write_errors,
+            "read_errors": self.read_errors,
+            "stale_reads": self.stale_reads,
+            "stale_ids": self.stale_ids.to_dict(),
+            "last_id": self.last_id,
+            "last_id_before_error": self.last_id_before_error,
+            "acked": self.acked.dump(),
+            "downtime_windows": windows,
+            "last_fp": self.last_fp,
+            "latency": {op: h.to_dict() for op, h in self.latency.items()},
+            "timeline": self.timeline.to_dict(),
+            "slots": {op: asdict(st) for op, st in self.slots.items()},
+        }
+
+    def absorb(self, snapshots: List[dict]):
+        """Merge worker snapshots: counters add up, downtime is the union of the windows"""
+        if not snapshots:
+            return
+        self.writes.reset(sum(s["write_count"] for s in snapshots))
+        self.reads.reset(sum(s["read_count"] for s in snapshots))
+        self.write_fails.reset(sum(s["write_errors"] for s in snapshots))
+        self.read_fails.reset(sum(s["read_errors"] for s in snapshots))
+        self.stale.reset(sum(s["stale_reads"] for s in snapshots))
+        self.stale_ids = merge_all((s["stale_ids"] for s in snapshots), CountHistogram)
+        newest = max(snapshots, key=lambda s: s["last_id"])
+        self.newest_id.reset(newest["last_id"])
+        if newest["last_fp"]:
+            self.last_fp = newest["last_fp"]
+        for s in snapshots:
+            self.acked.merge(s["acked"])
+        for op in self.latency:
+            self.latency[op] = merge_all(s["latency"].get(op) for s in snapshots)
+        self.timeline.absorb([s["timeline"] for s in snapshots])
+        for s in snapshots:
+            for op, st in s["slots"].items():
+                mine = self.slots.setdefault(op, SlotStats())
+                mine.issued += st["issued"]
+                mine.late += st["late"]
+                mine.missed += st["missed"]
+                mine.max_lag_ms = max(mine.max_lag_ms, st["max_lag_ms"])
+        before = [s["last_id_before_error"] for s in snapshots if s["last_id_before_error"] is not None]
+        self.last_id_before_error = max(before) if before else None
+
+        # An outage is visible to every worker: overlapping windows count once
+        windows = []
+        for s in snapshots:
+            windows.extend(s["downtime_windows"])
+        merged = []
+        for start, end in sorted(windows, key=lambda w: w[0]):
+            if merged and (merged[-1][1] is None or start <= merged[-1][1]):
+                last_start, last_end = merged[-1]
+                merged[-1] = (last_start, None if end is None or last_end is None else max(last_end, end))
+            else:
+                merged.append((start, end))
+        self.downtime_windows = [w for w in merged if w[1] is not None]
+        self.fail_started_at = next((w[0] for w in merged if w[1] is None), None)
+        self.downtime.reset(sum(end - start for start, end in self.downtime_windows))
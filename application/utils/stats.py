@@ -0,0 +1,51 @@
+import math
+import statistics
+from typing import Dict, Sequence
+
+# Two-sided 95% Student t quantiles by degrees of freedom (normal beyond 30)
+_T95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086, 25: 2.060, 30: 2.042,
+}
+
+
+def t95(df: int) -> float:
+    """Two-sided 95% t quantile (the next tabulated lower df, i.e. slightly conservative)"""
+    if df > 30:
+        return 1.960
+    return _T95[max(k for k in _T95 if k <= df)]
+
+
+def quantile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated quantile (q in 0-1) of a non-empty sequence"""
+    xs = sorted(values)
+    pos = (len(xs) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """
+    n, mean, median, p95, stdev, min, max and the 95% confidence interval of the
+    mean (Student t: trials are few; None below two values). Empty input gives
+    {"n": 0}.
+    """
+    xs = [v for v in values if v is not None]
+    if not xs:
+        return {"n": 0}
+    mean = statistics.fmean(xs)
+    stdev = statistics.stdev(xs) if len(xs) > 1 else 0.0
+    half = t95(len(xs) - 1) * stdev / math.sqrt(len(xs)) if len(xs) > 1 else None
+    return {
+        "n": len(xs),
+        "mean": mean,
+        "median": statistics.median(xs),
+        "p95": quantile(xs, 0.95),
+        "stdev": stdev,
+        "min": min(xs),
+        "max": max(xs),
+        "ci95_low": None if half is None else mean - half,
+        "ci95_high": None if half is None else mean + half,
+    }
@@ -0,0 +1,206 @@
+import json
+import time
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Tuple
+
+# Failed attempts kept per outage (the rest are only counted)
+MAX_ATTEMPTS = 1000
+# Identical marks from several workers closer than this are the same event
+MERGE_WINDOW_S = 2.0
+
+
+@dataclass
+class Outage:
+    """One write outage. Timestamps are time.monotonic() seconds."""
+    first_error_at: float
+    first_error: str
+    last_ok_at: Optional[float] = None      # last acknowledged commit before the outage
+    fp_before: Optional[str] = None
+    first_ok_at: Optional[float] = None     # first acknowledged commit after the outage
+    fp_after: Optional[str] = None
+    failed_attempts: int = 0
+    attempts: List[Tuple[float, str]] = field(default_factory=list)
+    last_failed_at: Optional[float] = None  # last failed attempt (attempts is capped)
+
+    @property
+    def rto_s(self) -> Optional[float]:
+        """
+        Last successful commit -> first successful commit.
+
+        Upper bound: the writer came back somewhere after the last failed attempt,
+        and the retry sleep in between is included (see rto_uncertainty_s).
+        """
+        if self.first_ok_at is None or self.last_ok_at is None:
+            return None
+        return self.first_ok_at - self.last_ok_at
+
+    @property
+    def rto_uncertainty_s(self) -> Optional[float]:
+        """Last failed attempt -> first successful commit: how much of rto_s may be backoff"""
+        if self.first_ok_at is None or self.last_failed_at is None:
+            return None
+        return max(0.0, self.first_ok_at - self.last_failed_at)
+
+    @property
+    def detection_s(self) -> Optional[float]:
+        """Last successful commit -> first failed attempt"""
+        if self.last_ok_at is None:
+            return None
+        return self.first_error_at - self.last_ok_at
+
+
+@dataclass
+class Mark:
+    """Point event on the same clock (DNS flip, RDS status change, failover request...)"""
+    at: float
+    kind: str
+    detail: str = ""
+
+
+class OutageTimeline:
+    """
+    Write outage timeline on the monotonic clock.
+
+    Every write attempt reports here: successes only move the "last commit" pointer,
+    failures open (or extend) an outage, and the next success closes it.
+
+    A success takes no lock while no outage is open: each thread keeps its own
+    last commit (one-item list, replaced in one assignment) and the outage that
+    opens reads the newest of them. The lock is taken by failures and by the
+    success that closes an outage.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.started_wall = time.time()
+        self.outages: List[Outage] = []
+        self.marks: List[Mark] = []
+        self._local = threading.local()
+        self._last_ok: List[list] = []  # per-thread [(at, fp)], copy-on-write
+        self._open: Optional[Outage] = None
+        self._lock = threading.Lock()
+
+    def write_ok(self, fp: Optional[str], at: Optional[float] = None) -> Optional[Outage]:
+        """Record an acknowledged commit; returns the outage it closes, if any"""
+        at = time.monotonic() if at is None else at
+        try:
+            last = self._local.last_ok
+        except AttributeError:
+            last = self._local.last_ok = [(at, fp)]
+            with self._lock:
+                self._last_ok = self._last_ok + [last]
+        if at > last[0][0]:
+            last[0] = (at, fp)
+        # Published before _open is read: an outage opened after this check sees this commit
+        if self._open is None:
+            return None
+        with self._lock:
+            closed = self._open
+            if closed is not None:
+                closed.first_ok_at, closed.fp_after = at, fp
+                self._open = None
+            return closed
+
+    def write_failed(self, err: Exception, at: Optional[float] = None) -> Outage:
+        """Record a failed write attempt; returns the open outage"""
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            outage = self._open
+            if outage is None:
+                outage = Outage(first_error_at=at, first_error=str(err).strip())
+                self.outages.append(outage)
+                self._open = outage
+                # After _open is set: a commit that missed it is already in its thread's slot
+                newest = max((last[0] for last in self._last_ok), default=None, key=lambda ok: ok[0])
+                if newest is not None:
+                    outage.last_ok_at, outage.fp_before = newest
+            outage.failed_attempts += 1
+            if outage.last_failed_at is None or at > outage.last_failed_at:
+                outage.last_failed_at = at
+            if len(outage.attempts) < MAX_ATTEMPTS:
+                outage.attempts.append((at, type(err).__name__))
+            return outage
+
+    def mark(self, kind: str, detail: str = "", at: Optional[float] = None) -> Mark:
+        m = Mark(time.monotonic() if at is None else at, kind, detail)
+        with self._lock:
+            self.marks.append(m)
+        return m
+
+    def rel(self, at: Optional[float]) -> Optional[float]:
+        """Seconds since the timeline started"""
+        return None if at is None else at - self.started_at
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "started_wall": self.started_wall,
+                "outages": [asdict(o) for o in self.outages],
+                "marks": [asdict(m) for m in self.marks],
+            }
+
+    def absorb(self, docs: List[dict]):
+        """
+        Merge worker timelines. Overlapping outages become one: commits stopped
+        when the last worker lost its writer and resumed with the first success.
+        """
+        outages = [Outage(**o) for d in docs for o in d["outages"]]
+        groups: List[List[Outage]] = []
+        for o in sorted(outages, key=lambda o: o.first_error_at):
+            start = o.last_ok_at if o.last_ok_at is not None else o.first_error_at
+            prev = groups[-1] if groups else None
+            prev_end = None if not prev else min(
+                (p.first_ok_at for p in prev if p.first_ok_at is not None), default=None
+            )
+            if prev and (prev_end is None or start <= prev_end):
+                prev.append(o)
+            else:
+                groups.append([o])
+
+        merged = []
+        for g in groups:
+            before = max((o for o in g if o.last_ok_at is not None), key=lambda o: o.last_ok_at, default=None)
+            # First error seen after the last commit anywhere
+            first = min(
+                (o for o in g if before is None or o.first_error_at >= before.last_ok_at),
+                key=lambda o: o.first_error_at, default=min(g, key=lambda o: o.first_error_at),
+            )
+            after = min((o for o in g if o.first_ok_at is not None), key=lambda o: o.first_ok_at, default=None)
+            attempts = sorted(a for o in g for a in o.attempts)[:MAX_ATTEMPTS]
+            # Last failure before the merged outage closed (later ones belong to slower workers)
+            last_failed = max((o.last_failed_at for o in g if o.last_failed_at is not None
+                               and (after is None or o.last_failed_at <= after.first_ok_at)), default=None)
+            merged.append(Outage(
+                first_error_at=first.first_error_at, first_error=first.first_error,
+                last_ok_at=before.last_ok_at if before else None, fp_before=before.fp_before if before else None,
+                first_ok_at=after.first_ok_at if after else None, fp_after=after.fp_after if after else None,
+                failed_attempts=sum(o.failed_attempts for o in g), attempts=[tuple(a) for a in attempts],
+                last_failed_at=last_failed,
+            ))
+        # Every worker sees the same DNS flip / status change: keep the earliest of each
+        marks = []
+        for m in sorted(self.marks + [Mark(**m) for d in docs for m in d["marks"]], key=lambda m: m.at):
+            dup = next((x for x in reversed(marks) if x.kind == m.kind and x.detail == m.detail), None)
+            if dup is None or m.at - dup.at > MERGE_WINDOW_S:
+                marks.append(m)
+        with self._lock:
+            self.outages = merged
+            self.marks = marks
+
+    def request_for(self, outage: Outage) -> Optional[Mark]:
+        """Latest "failover_requested" mark before the outage's first error (FAILOVER_AT_S runs)"""
+        start = outage.last_ok_at if outage.last_ok_at is not None else outage.first_error_at
+        with self._lock:
+            requests = [m for m in self.marks if m.kind == "failover_requested" and m.at <= outage.first_error_at]
+        prev = max(requests, key=lambda m: m.at, default=None)
+        # A request answered by an earlier outage does not explain this one
+        if prev is not None and any(o.first_ok_at is not None and prev.at < o.first_ok_at <= start
+                                    for o in self.outages if o is not outage):
+            return None
+        return prev
+
+    def export_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)